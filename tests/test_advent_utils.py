@@ -0,0 +1,199 @@
+import asyncio
+import os
+from pathlib import Path
+from random import Random
+
+from uqcsbot.utils.advent_utils import (
+    ADVENT_DAYS,
+    FG_COLOUR,
+    GOLD_COLOUR,
+    HL_COLOUR,
+    SILVER_COLOUR,
+    ColourFragment,
+    LeaderboardColumn,
+    Member,
+    build_leaderboard,
+    leaderboard_hash,
+    render_leaderboard_to_image,
+    render_leaderboard_to_image_cached,
+    render_leaderboard_to_text,
+    stream_leaderboard_text,
+    weighted_sample_without_replacement,
+    _isolate_leaderboard_layers,  # pyright: ignore [reportPrivateUsage]
+    _prune_image_cache,  # pyright: ignore [reportPrivateUsage]
+    _row_cache,  # pyright: ignore [reportPrivateUsage]
+    _split_leaderboard_rows,  # pyright: ignore [reportPrivateUsage]
+)
+
+
+def _make_members(count: int) -> list[Member]:
+    members: list[Member] = []
+    for i in range(count):
+        member = Member(i, f"Member {i}", count - i, 0, 0)
+        for day in ADVENT_DAYS:
+            if (i + day) % 3:
+                member.times[day][1] = 60 * day
+            if (i + day) % 5 == 0:
+                member.times[day][2] = 120 * day
+        member.star_total = sum(len(times) for times in member.times.values())
+        members.append(member)
+    return members
+
+
+def _make_columns() -> list[LeaderboardColumn]:
+    return [
+        LeaderboardColumn.ordering_column(),
+        LeaderboardColumn.padding_column(),
+        LeaderboardColumn.stars_column(),
+        LeaderboardColumn.padding_column(),
+        LeaderboardColumn.star_bar_column(),
+    ]
+
+
+def _overlay(spaces: str, layers: dict[str, str]) -> str:
+    """
+    Recombines colour layers into the original text, checking that no two layers
+    draw over the same character.
+    """
+    result = list(spaces)
+    for layer in layers.values():
+        assert len(layer) == len(spaces)
+        for i, c in enumerate(layer):
+            if not c.isspace():
+                assert result[i] == " "
+                result[i] = c
+    return "".join(result)
+
+
+def test_isolate_leaderboard_layers():
+    leaderboard = [
+        ColourFragment("Title\nrow", HL_COLOUR),
+        "\n 1) ",
+        ColourFragment("*", GOLD_COLOUR),
+        " name",
+    ]
+    spaces, layers = _isolate_leaderboard_layers(leaderboard)
+
+    assert spaces == "     \n   \n" + " " * 10
+    assert list(layers) == [HL_COLOUR, FG_COLOUR, GOLD_COLOUR]
+    assert layers[HL_COLOUR] == "Title\nrow\n" + " " * 10
+    assert layers[FG_COLOUR] == "     \n   \n 1)   name"
+    assert layers[GOLD_COLOUR] == "     \n   \n    *     "
+
+
+def test_isolate_leaderboard_layers_large_board():
+    # A "Show all" on a large private leaderboard renders every row at once.
+    leaderboard = build_leaderboard(_make_columns(), _make_members(1000), None)
+    spaces, layers = _isolate_leaderboard_layers(leaderboard)
+
+    assert spaces.count("\n") == 1000 + 1
+    assert set(layers) == {HL_COLOUR, FG_COLOUR, GOLD_COLOUR, SILVER_COLOUR}
+    text = render_leaderboard_to_text(leaderboard)
+    assert _overlay(spaces, layers) == text
+    # Each layer is exactly as long as the leaderboard, so the output (and the work to
+    # build it) is linear in the number of rows.
+    assert len(spaces) == len(text)
+    assert all(len(layer) == len(text) for layer in layers.values())
+
+
+def test_render_leaderboard_to_image_cached():
+    leaderboard = build_leaderboard(_make_columns(), _make_members(5), None)
+
+    first = asyncio.run(render_leaderboard_to_image_cached(leaderboard))
+    assert first.startswith(b"\x89PNG")
+    assert first == render_leaderboard_to_image(leaderboard)
+    # A separately built but identical leaderboard shares the cached image
+    rebuilt = build_leaderboard(_make_columns(), _make_members(5), None)
+    assert asyncio.run(render_leaderboard_to_image_cached(rebuilt)) is first
+    assert leaderboard_hash(leaderboard) != leaderboard_hash(leaderboard[:-1])
+
+
+def test_prune_image_cache(tmp_path: Path):
+    for i in range(10):
+        image_path = tmp_path / f"{i}.png"
+        image_path.write_bytes(b"")
+        os.utime(image_path, (i, i))
+    (tmp_path / "other.txt").write_text("")
+    # Using an image marks it as recent
+    os.utime(tmp_path / "0.png", (100, 100))
+
+    _prune_image_cache(str(tmp_path), 4)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "0.png",
+        "7.png",
+        "8.png",
+        "9.png",
+        "other.txt",
+    ]
+
+
+def test_split_leaderboard_rows():
+    leaderboard = [
+        ColourFragment("Title\nrow", HL_COLOUR),
+        "\n 1) ",
+        ColourFragment("*", GOLD_COLOUR),
+        "\n\n 2)",
+    ]
+    assert _split_leaderboard_rows(leaderboard) == [
+        [ColourFragment("Title", HL_COLOUR)],
+        [ColourFragment("row", HL_COLOUR)],
+        [" 1) ", ColourFragment("*", GOLD_COLOUR)],
+        [],
+        [" 2)"],
+    ]
+
+
+def test_render_leaderboard_to_image_reuses_rows():
+    members = _make_members(30)
+    render_leaderboard_to_image(build_leaderboard(_make_columns(), members, None))
+    rows_before = set(_row_cache)
+
+    # Only the changed row should need to be rendered again
+    members[10].star_total += 1
+    render_leaderboard_to_image(build_leaderboard(_make_columns(), members, None))
+    assert len(set(_row_cache) - rows_before) == 1
+
+
+def test_stream_leaderboard_text():
+    columns = _make_columns()
+    members = _make_members(250)
+    streamed = "".join(stream_leaderboard_text(columns, members, None, chunk_size=40))
+    assert streamed == render_leaderboard_to_text(
+        build_leaderboard(columns, members, None)
+    )
+
+
+def test_build_leaderboard_page():
+    columns = _make_columns()
+    members = _make_members(50)
+    page = render_leaderboard_to_text(
+        build_leaderboard(columns, members[20:40], None, start=21)
+    )
+    full = render_leaderboard_to_text(build_leaderboard(columns, members, None))
+    header = full.split("\n")[:2]
+    assert page.split("\n") == header + full.split("\n")[22:42]
+
+
+def test_weighted_sample_without_replacement():
+    population = list("abcdef")
+    weights = [5, 0, 1, 3, 0, 2]
+
+    first = weighted_sample_without_replacement(population, weights, 3, Random(42))
+    assert len(set(first)) == 3
+    assert "b" not in first and "e" not in first
+    # Inputs are untouched and the same seed gives the same draw
+    assert population == list("abcdef") and weights == [5, 0, 1, 3, 0, 2]
+    assert weighted_sample_without_replacement(population, weights, 3, Random(42)) == (
+        first
+    )
+    # Not enough items with a non-zero weight
+    assert weighted_sample_without_replacement(population, weights, 5, Random()) == []
+
+
+def test_weighted_sample_without_replacement_distribution():
+    rng = Random(2024)
+    counts = {"a": 0, "b": 0}
+    for _ in range(4000):
+        (winner,) = weighted_sample_without_replacement(["a", "b"], [3, 1], 1, rng)
+        counts[winner] += 1
+    assert 0.7 < counts["a"] / 4000 < 0.8
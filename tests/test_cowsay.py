@@ -0,0 +1,50 @@
+import time
+
+from uqcsbot.cowsay import Cowsay, CowsayCows, CowsayTuxes, CowsayWrapLength
+
+
+def test_word_wrap():
+    assert Cowsay.word_wrap("hello world", 40) == ["hello world"]
+    assert Cowsay.word_wrap("one two three", 8) == ["one two", "three"]
+    # Words longer than the wrap length are cut
+    assert Cowsay.word_wrap("ab " + "c" * 12, 5) == ["ab cc", "ccccc", "ccccc"]
+    # "\n" breaks lines, wherever it is in a word
+    assert Cowsay.word_wrap("a \\n b\\nc d\\n e", 40) == ["a", "b", "c d", "e"]
+
+
+def test_construct_bubble():
+    assert Cowsay.construct_bubble("moo", 40) == " _____ \n< moo >\n ----- \n"
+    assert Cowsay.construct_bubble("moo \\n moooo", 40, True) == (
+        " _______ \n( moo   )\n( moooo )\n ------- \n"
+    )
+    assert Cowsay.construct_bubble("a \\n bb \\n c", 40) == (
+        " ____ \n/ a  \\\n| bb |\n\\ c  /\n ---- \n"
+    )
+
+
+def test_templates():
+    assert CowsayCows[("Normal", False, False)] == (
+        "        \\   ^__^\n"
+        "         \\  (oo)\\_______\n"
+        "            (__)\\       )\\/\\ \n"
+        "                ||----w |\n"
+        "                ||     ||\n"
+    )
+    assert "U  ||" in CowsayCows[("Dead", True, True)]
+    assert "|x_x |" in CowsayTuxes[("Dead", False)]
+
+
+def test_construct_bubble_benchmark():
+    # The longest messages allowed, with many short words, line breaks or no spaces at all
+    messages = [
+        ("moo " * 250)[:1000],
+        ("a\\nb " * 250)[:1000],
+        "m" * 1000,
+    ]
+    start = time.perf_counter()
+    for _ in range(100):
+        for message in messages:
+            bubble = Cowsay.construct_bubble(message, CowsayWrapLength)
+            assert all(len(line) <= CowsayWrapLength + 4 for line in bubble.split("\n"))
+    # Well under a millisecond each on any reasonable machine
+    assert time.perf_counter() - start < 1
@@ -1,5 +1,19 @@
+from pathlib import Path
+
+import pytest
+
 # For testing private methods, we need to tell pyright to be quiet
-from uqcsbot.haiku import _number_of_syllables_in_word, _find_haiku # pyright: ignore [reportPrivateUsage]
+from uqcsbot.haiku import (
+    _number_of_syllables_in_word,  # pyright: ignore [reportPrivateUsage]
+    _find_haiku,  # pyright: ignore [reportPrivateUsage]
+    _number_of_syllables_in_lowercase_word,  # pyright: ignore [reportPrivateUsage]
+    _syllable_cache_hit_rate,  # pyright: ignore [reportPrivateUsage]
+    _AffixTrie,  # pyright: ignore [reportPrivateUsage]
+    _could_be_haiku,  # pyright: ignore [reportPrivateUsage]
+    _load_syllable_rules,  # pyright: ignore [reportPrivateUsage]
+    SyllableRulesError,
+    SYLLABLE_RULES_PATH,
+)
 
 
 def test_number_of_syllables_in_word():
@@ -16,6 +30,10 @@ def test_number_of_syllables_in_word():
         "help😄": 1,
         "help<:disapproval:1053481630037196931>": 1,
         "<:disapproval:1053481630037196931>": 0,
+        "<a:disapproval:1053481630037196931>": 0,
+        # emote names can't contain colons, so these are words rather than an emote
+        "<:hello:world:1>": 3,
+        "<:a:b:1>": 1,
         "mis-fire": 2,
         "opportunity": 5,
         "acted": 2,
@@ -113,6 +131,10 @@ def test_number_of_syllables_in_word():
         "résumé": 3,
         "pâté": 2,
         "naïve": 2,
+        # Replacements that are longer than the accented letter
+        "archæology": 4,
+        "encyclopædia": 5,
+        "phœnix": 2,
         "varied": 2,
         "career": 3,
         "preach": 1,
@@ -358,8 +380,77 @@ def test_find_haiku():
         "socially inept people? in MY computer science discord server", # miri#2222
     ]
     for haiku in true_cases:
+        assert _could_be_haiku(haiku)
         is_haiku, _ = _find_haiku(haiku)
         assert is_haiku
     for text in false_cases:
         is_haiku, _ = _find_haiku(text)
         assert not is_haiku
+
+
+def test_syllable_cache():
+    _number_of_syllables_in_lowercase_word.cache_clear()
+    assert _syllable_cache_hit_rate() == 0
+    # Words are cached by their lowercase form, so all but the first of these are hits
+    for word in ["Haiku", "haiku", "HAIKU", "haiku"]:
+        assert _number_of_syllables_in_word(word) == 2
+    assert _number_of_syllables_in_lowercase_word.cache_info().misses == 1
+    assert _syllable_cache_hit_rate() == 0.75
+
+
+def test_affix_trie():
+    prefixes = _AffixTrie(["re", "rea", "pre", "re"])
+    assert list(prefixes.find("reach")) == [0, 3, 1]
+    assert prefixes.matches("preach")
+    assert not prefixes.matches("r")
+    suffixes = _AffixTrie(["ly", "fully", "ness"], reverse=True)
+    assert list(suffixes.find("hopefully")) == [0, 1]
+    assert suffixes.matches("kindness")
+    assert not suffixes.matches("hopeful")
+
+
+def test_could_be_haiku():
+    assert not _could_be_haiku("too short")
+    assert not _could_be_haiku("a b c d e f g h i j k l m n o p q r")
+    assert not _could_be_haiku("word " * 100)
+    # Punctuation and emotes are not words
+    assert not _could_be_haiku("two words ! <:disapproval:1053481630037196931> 123")
+    assert _could_be_haiku("now three words ! <:disapproval:1053481630037196931>")
+    # Only real emotes are removed, not words that happen to be between colons
+    assert _could_be_haiku("<:these are: real words:1>")
+
+
+def test_syllable_rules_snapshot(tmp_path: Path):
+    rules_path = tmp_path / "syllable_rules.yaml"
+    snapshot_path = tmp_path / "syllable_rules.snapshot"
+    with open(SYLLABLE_RULES_PATH, "r", encoding="utf-8") as rules_file:
+        rules_path.write_text(rules_file.read(), encoding="utf-8")
+
+    rules = _load_syllable_rules(str(rules_path), str(snapshot_path))
+    assert snapshot_path.exists()
+    assert _load_syllable_rules(str(rules_path), str(snapshot_path)) == rules
+
+    # A stale snapshot is rebuilt from the changed rules
+    rules_path.write_text(
+        rules_path.read_text(encoding="utf-8").replace('"yt": 2', '"yt": 3'),
+        encoding="utf-8",
+    )
+    assert _load_syllable_rules(str(rules_path), str(snapshot_path))[1]["yt"] == 3
+
+
+def test_invalid_syllable_rules(tmp_path: Path):
+    rules_path = tmp_path / "syllable_rules.yaml"
+    snapshot_path = str(tmp_path / "syllable_rules.snapshot")
+    with open(SYLLABLE_RULES_PATH, "r", encoding="utf-8") as rules_file:
+        valid_rules = rules_file.read()
+
+    for invalid_rules, error in [
+        ("- not a mapping", "mapping of rule names"),
+        (valid_rules + "\nprefixes_with_a_typo: []", "unknown rules"),
+        (valid_rules.replace('"ok": 2', '"ok": two'), "exceptions"),
+        (valid_rules.replace('"æ": "ae"', '"ææ": "ae"'), "accents"),
+        (valid_rules.replace('"ism",', '"ism", 3,'), "must be a list of strings"),
+    ]:
+        rules_path.write_text(invalid_rules, encoding="utf-8")
+        with pytest.raises(SyllableRulesError, match=error):
+            _load_syllable_rules(str(rules_path), snapshot_path)
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import datetime as dt
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from uqcsbot.models import Base, Reminders, upgrade_database
+
+
+def test_upgrade_database(tmp_path: Path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+    # The reminders table as created by older versions of the bot
+    with db_engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE reminders (id BIGINT NOT NULL, user_id BIGINT NOT NULL, "
+                "channel_id BIGINT, time_created DATETIME NOT NULL, "
+                "message VARCHAR NOT NULL, time TIME NOT NULL, start_date DATE NOT NULL, "
+                "end_date DATE, week_frequency INTEGER, PRIMARY KEY (id))"
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO reminders VALUES (5, 1, NULL, '2024-01-01 09:00:00.000000', "
+                "'old', '09:00:00.000000', '2024-01-02', NULL, NULL)"
+            )
+        )
+    Base.metadata.create_all(db_engine)
+    upgrade_database(db_engine)
+    # Running it again changes nothing
+    upgrade_database(db_engine)
+
+    indexes = inspect(db_engine).get_indexes("reminders")
+    assert [index["column_names"] for index in indexes] == [["user_id"]]
+
+    # Existing reminders are kept, and new ids are allocated after them
+    session = sessionmaker(db_engine)()
+    assert [reminder.message for reminder in session.query(Reminders)] == ["old"]
+    reminder = Reminders(
+        user_id=2,
+        channel_id=None,
+        time_created=dt.datetime(2024, 1, 1, 9),
+        message="new",
+        time=dt.time(9),
+        start_date=dt.date(2024, 1, 2),
+        end_date=None,
+        week_frequency=None,
+    )
+    session.add(reminder)
+    session.commit()
+    assert reminder.id == 6
+    session.close()
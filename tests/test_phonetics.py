@@ -0,0 +1,39 @@
+# For testing private methods, we need to tell pyright to be quiet
+from uqcsbot.phonetics import (
+    IPA_TO_XSAMPA,
+    XSAMPA_TO_IPA,
+    _code_span,  # pyright: ignore [reportPrivateUsage]
+)
+
+
+def test_xsampa_to_ipa():
+    assert XSAMPA_TO_IPA.convert("j}kj}sI(j)EsbQt") == "jʉkjʉsɪ(j)ɛsbɒt"
+    # The longest symbol is always used, whichever table it is in
+    assert XSAMPA_TO_IPA.convert("G\\_<G\\G") == "ʛɢɣ"
+    assert XSAMPA_TO_IPA.convert("b_<b_b") == "ɓb_b"
+    # "-" separates symbols without being shown
+    assert XSAMPA_TO_IPA.convert("t-S") == "tʃ"
+    assert XSAMPA_TO_IPA.convert("") == ""
+
+
+def test_ipa_to_xsampa():
+    assert IPA_TO_XSAMPA.convert("jʉkjʉsɪ(j)ɛsbɒt") == "j}kj}sI(j)EsbQt"
+    assert IPA_TO_XSAMPA.convert("ʛɢɣ") == "G\\_<G\\G"
+    for xsampa in ["j}kj}sI(j)EsbQt", "h\\Ela`U", '"tSEk_hIN']:
+        ipa = XSAMPA_TO_IPA.convert(xsampa)
+        assert XSAMPA_TO_IPA.convert(IPA_TO_XSAMPA.convert(ipa)) == ipa
+
+
+def test_code_span():
+    assert _code_span("h\\Ela`U") == "`` h\\Ela`U ``"
+    assert _code_span("`a") == "`` `a ``"
+    assert _code_span("a_b*c") == "`a_b*c`"
+    assert _code_span("a``b") == "```\na``b\n```"
+
+
+def test_xsampa_long_input():
+    # Pasted transcriptions can be long
+    xsampa = "j}kj}sI(j)EsbQt G\\_< " * 10000
+    ipa = XSAMPA_TO_IPA.convert(xsampa)
+    assert ipa == "jʉkjʉsɪ(j)ɛsbɒt ʛ " * 10000
+    assert IPA_TO_XSAMPA.convert(ipa) == xsampa
@@ -0,0 +1,159 @@
+import asyncio
+from datetime import date, datetime, time, timedelta, tzinfo
+from random import Random
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from uqcsbot.utils.reminder_utils import (
+    REMINDER_TIMEZONE,
+    ReminderDispatcher,
+    ReminderQueue,
+    next_occurrence,
+    pack_messages,
+)
+
+START = datetime(2024, 3, 1, 9, 0, tzinfo=REMINDER_TIMEZONE)
+
+
+def test_reminder_queue():
+    queue: ReminderQueue[str] = ReminderQueue()
+    queue.push("b", START + timedelta(minutes=2))
+    queue.push("a", START + timedelta(minutes=1))
+    queue.push("c", START + timedelta(minutes=3))
+    queue.push("d", START + timedelta(minutes=1))
+
+    # Rescheduling replaces the previous time, and removed keys are never due
+    queue.push("c", START)
+    assert queue.remove("b")
+    assert not queue.remove("b")
+    assert len(queue) == 3
+    assert queue.next_time() == START
+
+    assert queue.pop_due(START + timedelta(seconds=59)) == [("c", START)]
+    assert queue.pop_due(START + timedelta(minutes=5)) == [
+        ("a", START + timedelta(minutes=1)),
+        ("d", START + timedelta(minutes=1)),
+    ]
+    assert len(queue) == 0
+    assert queue.next_time() is None
+
+
+def test_reminder_queue_load():
+    # Enough reminders that a linear scan per operation would be noticeably slow
+    rng = Random(100_000)
+    queue: ReminderQueue[int] = ReminderQueue()
+    for i in range(100_000):
+        queue.push(i, START + timedelta(seconds=rng.randrange(7 * 24 * 60 * 60)))
+    for i in range(0, 100_000, 2):
+        queue.remove(i)
+    assert len(queue) == 50_000
+
+    due = queue.pop_due(START + timedelta(days=7))
+    assert len(due) == 50_000
+    assert all(key % 2 == 1 for key, _ in due)
+    assert [when for _, when in due] == sorted(when for _, when in due)
+
+
+def test_reminder_dispatcher_batches():
+    batches: List[List[Tuple[str, datetime]]] = []
+
+    async def callback(due: List[Tuple[str, datetime]]):
+        batches.append(due)
+
+    async def run():
+        now = datetime.now(tz=REMINDER_TIMEZONE)
+        dispatcher: ReminderDispatcher[str] = ReminderDispatcher(callback)
+        dispatcher.schedule("first", now - timedelta(seconds=1))
+        dispatcher.schedule("second", now - timedelta(seconds=1))
+        dispatcher.schedule("cancelled", now + timedelta(milliseconds=50))
+        dispatcher.schedule("later", now + timedelta(milliseconds=100))
+        dispatcher.start()
+        dispatcher.cancel("cancelled")
+        await asyncio.sleep(0.3)
+        dispatcher.stop()
+        assert len(dispatcher) == 0
+
+    asyncio.run(run())
+    assert [[key for key, _ in batch] for batch in batches] == [
+        ["first", "second"],
+        ["later"],
+    ]
+
+
+def _next_occurrence_by_stepping(
+    start_date: date,
+    time_of_day: time,
+    week_frequency: int,
+    end_date: Optional[date],
+    after: datetime,
+    timezone: tzinfo,
+) -> Optional[datetime]:
+    """Finds the next occurrence by stepping through every occurrence from the start."""
+    period = timedelta(days=7 * week_frequency if week_frequency > 0 else 1)
+    next_date = start_date
+    while datetime.combine(next_date, time_of_day, tzinfo=timezone) <= after:
+        next_date += period
+    if end_date is not None and next_date > end_date:
+        return None
+    return datetime.combine(next_date, time_of_day, tzinfo=timezone)
+
+
+def test_next_occurrence():
+    # weekly, starting on a Monday at 9am
+    start = date(2024, 3, 4)
+    nine = time(9, 0)
+    assert next_occurrence(start, nine, 1, None, START) == datetime(
+        2024, 3, 4, 9, 0, tzinfo=REMINDER_TIMEZONE
+    )
+    assert next_occurrence(
+        start, nine, 1, None, datetime(2024, 3, 4, 9, 0, tzinfo=REMINDER_TIMEZONE)
+    ) == datetime(2024, 3, 11, 9, 0, tzinfo=REMINDER_TIMEZONE)
+    # daily, from a time given in another timezone
+    assert next_occurrence(
+        start, nine, 0, None, datetime(2030, 1, 1, 0, 0, tzinfo=ZoneInfo("UTC"))
+    ) == datetime(2030, 1, 2, 9, 0, tzinfo=REMINDER_TIMEZONE)
+    # ended
+    assert (
+        next_occurrence(start, nine, 2, date(2024, 3, 17), START.replace(day=5)) is None
+    )
+
+
+def test_next_occurrence_matches_stepping():
+    rng = Random(32)
+    timezones = [REMINDER_TIMEZONE, ZoneInfo("Australia/Sydney"), ZoneInfo("UTC")]
+    for _ in range(5000):
+        timezone = rng.choice(timezones)
+        start_date = date(2020, 1, 1) + timedelta(days=rng.randrange(2000))
+        time_of_day = time(rng.randrange(24), rng.choice([0, 30, 59]))
+        week_frequency = rng.randrange(5)
+        end_date = (
+            None
+            if rng.random() < 0.5
+            else start_date + timedelta(days=rng.randrange(400))
+        )
+        after = datetime.combine(
+            start_date + timedelta(days=rng.randrange(-30, 800)),
+            time(rng.randrange(24), rng.choice([0, 29, 30, 31, 59])),
+            tzinfo=rng.choice(timezones),
+        )
+        args = (start_date, time_of_day, week_frequency, end_date, after, timezone)
+
+        result = next_occurrence(*args)
+        assert result == _next_occurrence_by_stepping(*args)
+        if result is not None:
+            assert result > after
+            assert result.tzinfo == timezone
+
+
+def test_pack_messages():
+    assert pack_messages([]) == []
+    assert pack_messages(["a", "b", "c"], limit=10) == ["a\n\nb\n\nc"]
+    assert pack_messages(["aaaa", "bbbb", "cc"], limit=10) == ["aaaa\n\nbbbb", "cc"]
+    # too long to fit in a single message
+    assert pack_messages(["a", "b" * 25, "c"], limit=10) == [
+        "a",
+        "b" * 10,
+        "b" * 10,
+        "bbbbb\n\nc",
+    ]
+    assert all(len(message) <= 2000 for message in pack_messages(["x" * 700] * 10))
@@ -0,0 +1,99 @@
+import time
+from typing import Callable
+
+from uqcsbot.morse import Morse, MorseCodeDict
+from uqcsbot.utils.text_utils import (
+    MESSAGE_LENGTH_LIMIT,
+    bytes_to_bits,
+    caesar_table,
+    replace_emotes_with_names,
+    sanitise_illegals,
+    split_message,
+)
+
+
+def _caesar_by_character(message: str, distance: int) -> str:
+    result = ""
+    for c in message:
+        if ord("A") <= ord(c) <= ord("Z"):
+            result += chr((ord(c) - ord("A") + distance) % 26 + ord("A"))
+        elif ord("a") <= ord(c) <= ord("z"):
+            result += chr((ord(c) - ord("a") + distance) % 26 + ord("a"))
+        else:
+            result += c
+    return result
+
+
+def _morse_by_character(message: str) -> str:
+    cipher = ""
+    for letter in message:
+        cipher += MorseCodeDict[letter] + "  "
+    return cipher
+
+
+def _time(function: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    for _ in range(20):
+        function()
+    return time.perf_counter() - start
+
+
+def test_caesar_table():
+    message = "Hello, World! Zz Ωmega 123"
+    for distance in [-27, -1, 0, 1, 13, 25, 26, 100]:
+        assert message.translate(caesar_table(distance)) == _caesar_by_character(
+            message, distance
+        )
+    assert "Uryyb".translate(caesar_table(13)) == "Hello"
+
+
+def test_morse():
+    assert Morse.encrypt_to_morse("SOS") == _morse_by_character("SOS")
+    assert Morse.check("HELLO, WORLD!") == "!"
+    assert Morse.check("HELLO") == ""
+
+
+def test_replace_emotes_with_names():
+    assert (
+        replace_emotes_with_names(
+            "hi <:disapproval:1053481630037196931> <a:party:123> <:not an emote:1>"
+        )
+        == "hi :disapproval: :party: <:not an emote:1>"
+    )
+
+
+def test_sanitise_illegals():
+    # morse removes every backtick, cowsay only breaks up code blocks
+    assert sanitise_illegals("  `hi` there\n") == "hi there"
+    assert sanitise_illegals(" ```hi``` `x`", "```", "'''") == "'''hi''' `x`"
+
+
+def test_bytes_to_bits():
+    assert bytes_to_bits(b"") == ""
+    assert bytes_to_bits("hi".encode()) == "0110100001101001"
+
+
+def test_split_message():
+    assert split_message("") == [""]
+    assert split_message("short") == ["short"]
+    assert split_message("a" * 25, limit=10) == ["a" * 10, "a" * 10, "a" * 5]
+    # Splits at whitespace in the second half of the limit where possible
+    assert split_message("aaaaaaa bbbbbbb", limit=10) == ["aaaaaaa ", "bbbbbbb"]
+    assert split_message("aa bbbbbbbbbbbb", limit=10) == ["aa bbbbbbb", "bbbbb"]
+    messages = split_message("word " * 1000)
+    assert "".join(messages) == "word " * 1000
+    assert all(len(message) <= MESSAGE_LENGTH_LIMIT for message in messages)
+
+
+def test_transform_benchmarks():
+    # Translating with a table should beat building the string a character at a time
+    message = "The quick brown fox jumps over the lazy dog. " * 100
+    table = caesar_table(3)
+    assert _time(lambda: message.translate(table)) < _time(
+        lambda: _caesar_by_character(message, 3)
+    )
+
+    morse_message = message.upper()
+    assert _time(lambda: Morse.encrypt_to_morse(morse_message)) < _time(
+        lambda: _morse_by_character(morse_message)
+    )
@@ -0,0 +1,221 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Barrier, Thread
+from typing import Iterator, List, Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from uqcsbot.models import Base, CourseCacheEntries, CourseQueries
+from uqcsbot.utils import uq_course_utils
+from uqcsbot.utils.uq_course_utils import (
+    AssessmentItem,
+    CourseCache,
+    Exam,
+    Offering,
+    ProfileNotFoundException,
+    course_cache,
+    get_course_assessment_items,
+    get_course_profile_url,
+    get_past_exams,
+    get_popular_courses,
+    prefetch_course,
+    record_course_queries,
+    remove_unpopular_courses,
+)
+
+OFFERING = Offering("1")
+ASSESSMENT = [
+    AssessmentItem(
+        "CSSE1001",
+        "Exam",
+        "Final Exam",
+        "https://course-profiles.uq.edu.au/a#1",
+        "End of Semester Exam Period",
+        "50%",
+    )
+]
+
+
+@pytest.fixture
+def requests_made(monkeypatch: pytest.MonkeyPatch) -> Iterator[List[str]]:
+    """Replaces the UQ requests with canned results, recording what was requested."""
+    requests_made: List[str] = []
+
+    def fetch_course_profile_url(
+        course_name: str,
+        offering: Optional[Offering] = None,
+        year: Optional[int] = None,
+    ) -> str:
+        requests_made.append(f"profile {course_name}")
+        if course_name == "COMP9999":
+            raise ProfileNotFoundException(course_name, offering)
+        return f"https://course-profiles.uq.edu.au/{course_name}"
+
+    def fetch_course_assessment_items(
+        course_name: str, offering: Offering, course_profile_url: Optional[str] = None
+    ) -> List[AssessmentItem]:
+        requests_made.append(f"assessment {course_name}")
+        return ASSESSMENT
+
+    def fetch_past_exams(course_code: str) -> List[Exam]:
+        requests_made.append(f"past exams {course_code}")
+        return [Exam(2023, "Sem 1", f"https://api.library.uq.edu.au/{course_code}")]
+
+    monkeypatch.setattr(
+        uq_course_utils, "_fetch_course_profile_url", fetch_course_profile_url
+    )
+    monkeypatch.setattr(uq_course_utils, "_fetch_past_exams", fetch_past_exams)
+    monkeypatch.setattr(
+        uq_course_utils, "_fetch_course_assessment_items", fetch_course_assessment_items
+    )
+    course_cache.clear()
+    yield requests_made
+    course_cache.clear()
+
+
+def test_course_cache(requests_made: List[str]):
+    url = "https://course-profiles.uq.edu.au/CSSE1001"
+    assert get_course_profile_url("CSSE1001", OFFERING) == url
+    assert get_course_profile_url("csse1001", OFFERING) == url
+    # A different offering or year is a different entry
+    assert get_course_profile_url("CSSE1001", Offering("2")) == url
+    assert get_course_profile_url("CSSE1001", OFFERING, 2024) == url
+    assert get_course_assessment_items("CSSE1001", OFFERING, url) == ASSESSMENT
+    assert get_course_assessment_items("CSSE1001", OFFERING) == ASSESSMENT
+    assert requests_made == [
+        "profile CSSE1001",
+        "profile CSSE1001",
+        "profile CSSE1001",
+        "assessment CSSE1001",
+    ]
+
+
+def test_course_cache_not_found(requests_made: List[str]):
+    for _ in range(3):
+        with pytest.raises(ProfileNotFoundException):
+            get_course_profile_url("COMP9999", OFFERING)
+    assert requests_made == ["profile COMP9999"]
+
+
+def test_course_cache_prefetch(requests_made: List[str]):
+    prefetch_course("CSSE1001", OFFERING)
+    assert len(requests_made) == 3
+    # Prefetched entries are served without contacting UQ
+    assert get_course_profile_url("CSSE1001", OFFERING)
+    assert get_course_assessment_items("CSSE1001", OFFERING) == ASSESSMENT
+    assert [exam.year for exam in get_past_exams("csse1001")] == [2023]
+    assert len(requests_made) == 3
+
+
+def test_course_cache_expiry():
+    cache = CourseCache()
+    cache.set("profile_url", "CSSE1001", "", '"url"')
+    cache.set("profile_url", "CSSE1002", "", None, timedelta(hours=1))
+    cache.set("profile_url", "CSSE1003", "", '"url"', timedelta(seconds=-1))
+    assert cache.get("profile_url", "csse1001", "") == (True, '"url"')
+    assert cache.get("profile_url", "CSSE1002", "") == (True, None)
+    assert cache.get("profile_url", "CSSE1003", "") == (False, None)
+    assert cache.get("assessment", "CSSE1001", "") == (False, None)
+
+
+def test_course_cache_database(tmp_path: Path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(db_engine)
+    create_db_session = sessionmaker(bind=db_engine)
+
+    cache = CourseCache()
+    cache.use_database(create_db_session)
+    cache.set("profile_url", "CSSE1001", "", '"url"')
+    cache.set("profile_url", "CSSE1001", "", '"new url"')
+    cache.set("profile_url", "COMP9999", "", None)
+
+    # A new cache (e.g. after a restart) loads entries from the database
+    restarted_cache = CourseCache()
+    restarted_cache.use_database(create_db_session)
+    assert restarted_cache.get("profile_url", "CSSE1001", "") == (True, '"new url"')
+    assert restarted_cache.get("profile_url", "COMP9999", "") == (True, None)
+    assert restarted_cache.get("profile_url", "CSSE1002", "") == (False, None)
+
+
+def test_course_cache_purge_expired(tmp_path: Path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(db_engine)
+    create_db_session = sessionmaker(bind=db_engine)
+
+    cache = CourseCache()
+    cache.use_database(create_db_session)
+    cache.set("profile_url", "CSSE1001", "", '"url"')
+    cache.set("profile_url", "COMP9999", "", None, timedelta(seconds=-1))
+    cache.set("profile_url", "COMP9998", "", None, timedelta(seconds=-1))
+
+    # Expired entries are removed from memory when they are read
+    assert cache.get("profile_url", "COMP9999", "") == (False, None)
+    assert len(cache._entries) == 2  # pyright: ignore [reportPrivateUsage]
+
+    assert cache.purge_expired() == 2
+    assert len(cache._entries) == 1  # pyright: ignore [reportPrivateUsage]
+    db_session = create_db_session()
+    assert [row.course_code for row in db_session.query(CourseCacheEntries)] == [
+        "CSSE1001"
+    ]
+    db_session.close()
+
+
+def test_popular_courses(tmp_path: Path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}")
+    Base.metadata.create_all(db_engine)
+    create_db_session = sessionmaker(bind=db_engine)
+
+    record_course_queries(create_db_session, ["CSSE1001", "csse1001", "MATH1061"])
+    record_course_queries(create_db_session, ["CSSE2002", "MATH1061"])
+    record_course_queries(create_db_session, ["MATH1061"])
+    start = datetime.now() - timedelta(minutes=1)
+    assert get_popular_courses(create_db_session, 2, start) == [
+        "MATH1061",
+        "CSSE1001",
+    ]
+    assert get_popular_courses(create_db_session, 5, start) == [
+        "MATH1061",
+        "CSSE1001",
+        "CSSE2002",
+    ]
+    assert get_popular_courses(create_db_session, 5, datetime.now()) == []
+
+    # Courses not queried recently are removed, so the table can't grow without bound
+    assert remove_unpopular_courses(create_db_session, start) == 0
+    assert remove_unpopular_courses(create_db_session, datetime.now()) == 3
+    assert get_popular_courses(create_db_session, 5, start) == []
+
+
+def test_popular_courses_concurrent_first_queries(tmp_path: Path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}")
+    Base.metadata.create_all(db_engine)
+    create_db_session = sessionmaker(bind=db_engine)
+
+    # Every thread records the first query for the course at the same time
+    barrier = Barrier(8)
+
+    def query():
+        barrier.wait()
+        record_course_queries(create_db_session, ["CSSE1001"])
+
+    threads = [Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db_session = create_db_session()
+    course_queries = db_session.get(CourseQueries, "CSSE1001")
+    assert course_queries is not None and course_queries.count == 8
+    db_session.close()
+
+
+def test_record_course_queries_best_effort():
+    def create_db_session() -> Session:
+        raise OperationalError("connect", {}, Exception("database is down"))
+
+    # Errors are logged, not raised
+    record_course_queries(create_db_session, ["CSSE1001"])
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from uqcsbot import whatsdue
+from uqcsbot.models import Base, CourseQueries
+from uqcsbot.utils.uq_course_utils import (
+    AssessmentItem,
+    Offering,
+    ProfileNotFoundException,
+)
+
+# For testing private methods, we need to tell pyright to be quiet
+from uqcsbot.whatsdue import (
+    _build_embed,  # pyright: ignore [reportPrivateUsage]
+    _fetch_course,  # pyright: ignore [reportPrivateUsage]
+)
+
+ASSESSMENT = [
+    AssessmentItem(
+        "CSSE1001",
+        "Project",
+        "Assignment 1",
+        "https://course-profiles.uq.edu.au/CSSE1001#a1",
+        "1/4/2030 15:00",
+        "25%",
+    ),
+    AssessmentItem(
+        "MATH1061",
+        "Quiz",
+        "Quiz 1",
+        "https://course-profiles.uq.edu.au/MATH1061#q1",
+        "1/3/2030 15:00",
+        "5%",
+    ),
+]
+PROFILE_URLS = {
+    "CSSE1001": "https://course-profiles.uq.edu.au/CSSE1001",
+    "MATH1061": "https://course-profiles.uq.edu.au/MATH1061",
+}
+
+
+def test_build_embed_partial():
+    embed = _build_embed(
+        ["CSSE1001", "MATH1061"],
+        ASSESSMENT[:1],
+        {"CSSE1001": PROFILE_URLS["CSSE1001"]},
+        False,
+        "Date",
+        False,
+        True,
+    )
+    assert embed.description is not None
+    assert embed.description.startswith("*Fetching assessment (1/2 courses found)...*")
+    # ECP links are only shown once every course has been found
+    assert [field.name for field in embed.fields] == ["CSSE1001"]
+
+
+def test_build_embed_complete():
+    embed = _build_embed(
+        ["CSSE1001", "MATH1061"],
+        ASSESSMENT,
+        PROFILE_URLS,
+        False,
+        "Weight",
+        False,
+        True,
+    )
+    assert embed.description is not None
+    assert "Fetching" not in embed.description
+    assert [field.name for field in embed.fields] == [
+        "MATH1061",
+        "CSSE1001",
+        "Potential ECP Links",
+    ]
+    assert embed.fields[-1].value is not None
+    assert (
+        "[CSSE1001](https://course-profiles.uq.edu.au/CSSE1001#assessment)"
+        in embed.fields[-1].value
+    )
+    assert embed.footer.text is not None
+
+
+def test_build_embed_nothing_due():
+    profile_urls = {"CSSE1001": PROFILE_URLS["CSSE1001"]}
+    embed = _build_embed(["CSSE1001"], [], profile_urls, False, "Date", False, False)
+    assert [field.value for field in embed.fields] == ["Nothing seems to be due soon"]
+    embed = _build_embed(["CSSE1001"], [], profile_urls, True, "Date", False, False)
+    assert [field.value for field in embed.fields] == [
+        "No assessment items could be found"
+    ]
+    assert embed.footer.text is None
+
+
+def test_fetch_course_counts_found_courses(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}")
+    Base.metadata.create_all(db_engine)
+    create_db_session = sessionmaker(bind=db_engine)
+
+    def get_course_profile_url(
+        course_name: str, offering: Optional[Offering] = None
+    ) -> str:
+        if course_name not in PROFILE_URLS:
+            raise ProfileNotFoundException(course_name, offering)
+        return PROFILE_URLS[course_name]
+
+    def get_course_assessment_items(
+        course_name: str, offering: Offering, course_profile_url: str
+    ) -> List[AssessmentItem]:
+        return [item for item in ASSESSMENT if item.course_name == course_name]
+
+    monkeypatch.setattr(whatsdue, "get_course_profile_url", get_course_profile_url)
+    monkeypatch.setattr(
+        whatsdue, "get_course_assessment_items", get_course_assessment_items
+    )
+
+    async def fetch(course_name: str):
+        return await _fetch_course(
+            course_name,
+            Offering("1"),
+            (datetime.min, datetime.max),
+            asyncio.Semaphore(1),
+            threading.Event(),
+            create_db_session,
+        )
+
+    assert asyncio.run(fetch("CSSE1001"))[1] == PROFILE_URLS["CSSE1001"]
+    # Courses that can't be found (e.g. typos) are never counted
+    with pytest.raises(ProfileNotFoundException):
+        asyncio.run(fetch("NOTACOURSE"))
+
+    db_session = create_db_session()
+    assert [row.course_code for row in db_session.query(CourseQueries)] == ["CSSE1001"]
+    db_session.close()
@@ -0,0 +1,171 @@
+import asyncio
+import re
+import time
+from pathlib import Path
+from random import Random
+from typing import Dict
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from uqcsbot.models import Base, YellingBans
+from uqcsbot.yelling import Yelling, YellingOffences
+
+
+def _clean_text_by_replacing(message: str) -> str:
+    """The previous implementation of Yelling.clean_text, which makes a pass per link."""
+    text = re.sub(
+        r"<(?P<animated>a?):(?P<name>\w{2,32}):(?P<id>\d{18,22})>",
+        lambda m: m.group(0).upper(),
+        message,
+    )
+    for url in re.findall(r"https?:\/\/[^\s]+", text):
+        text = text.replace(url, url.upper())
+    return text.replace("&gt;", ">").replace("&lt;", "<").replace("&amp;", "&")
+
+
+def test_clean_text():
+    assert Yelling.clean_text("HELLO <:disapproval:1053481630037196931>") == (
+        "HELLO <:DISAPPROVAL:1053481630037196931>"
+    )
+    assert Yelling.clean_text("LOOK https://uqcs.org/a?b=c&amp;d AT THIS") == (
+        "LOOK HTTPS://UQCS.ORG/A?B=C&AMP;D AT THIS"
+    )
+    assert Yelling.clean_text("&gt; QUOTE &amp;lt; &lt;3") == "> QUOTE &lt; <3"
+
+
+def test_clean_text_matches_replacing():
+    rng = Random(38)
+    pieces = [
+        "YELL ",
+        "quiet ",
+        " ",
+        "\n",
+        "<:disapproval:1053481630037196931>",
+        "<a:party_parrot:123456789012345678>",
+        "<:x:1>",
+        # the previous implementation misses links which begin with an earlier link,
+        # so these are always followed by whitespace
+        "https://example.com/path?q=1 ",
+        "http://a.b/&gt;\n",
+        "&gt;",
+        "&lt;",
+        "&amp;",
+        "&",
+        "gt;",
+        "<",
+        ":",
+        "é",
+    ]
+    for _ in range(2000):
+        message = "".join(rng.choice(pieces) for _ in range(rng.randrange(20)))
+        assert Yelling.clean_text(message) == _clean_text_by_replacing(message)
+
+
+def test_contains_lowercase():
+    assert not Yelling.contains_lowercase("")
+    assert not Yelling.contains_lowercase("HELLO, WORLD! 123")
+    assert Yelling.contains_lowercase("HELLO, WORLd")
+    assert not Yelling.contains_lowercase("ÉCOLE")
+    assert Yelling.contains_lowercase("école")
+    assert Yelling.contains_lowercase("ΣΟΦΊΑ σ")
+
+
+def test_clean_text_link_heavy_benchmark():
+    # Long messages made almost entirely of links, for which replacing each link in
+    # turn takes time quadratic in the number of links
+    message = " ".join(f"https://example.com/{i}" for i in range(2000))[:20000]
+    messages = [message.replace("example", f"site{i}") for i in range(20)]
+
+    start = time.perf_counter()
+    cleaned = [Yelling.clean_text(message) for message in messages]
+    single_pass = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [_clean_text_by_replacing(message) for message in messages]
+    replacing = time.perf_counter() - start
+
+    assert cleaned == expected
+    assert not any(Yelling.contains_lowercase(text) for text in cleaned)
+    assert single_pass < replacing
+
+
+def _database_bans(create_db_session: "sessionmaker[Session]") -> Dict[int, int]:
+    db_session = create_db_session()
+    bans = {ban.user_id: ban.value for ban in db_session.query(YellingBans)}
+    db_session.close()
+    return bans
+
+
+@pytest.fixture
+def create_db_session(tmp_path: Path) -> "sessionmaker[Session]":
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'yelling.db'}")
+    Base.metadata.create_all(db_engine)
+    return sessionmaker(bind=db_engine)
+
+
+def test_yelling_offences(create_db_session: "sessionmaker[Session]"):
+    offences = YellingOffences(create_db_session)
+    assert offences.record_offence(1) == 0
+    assert offences.record_offence(1) == 1
+    assert offences.record_offence(2) == 0
+    # Nothing is written until a flush
+    assert _database_bans(create_db_session) == {}
+    asyncio.run(offences.flush())
+    assert _database_bans(create_db_session) == {1: 2, 2: 1}
+
+    assert offences.record_offence(1) == 2
+    asyncio.run(offences.decay())
+    assert offences.offences(1) == 2
+    assert offences.offences(2) == 0
+    assert _database_bans(create_db_session) == {1: 2}
+
+    # Counts are loaded from the database, e.g. after a restart
+    restarted_offences = YellingOffences(create_db_session)
+    restarted_offences.load()
+    assert restarted_offences.record_offence(1) == 2
+
+
+def test_yelling_offences_failed_flush(create_db_session: "sessionmaker[Session]"):
+    def create_broken_db_session() -> Session:
+        raise RuntimeError("database is down")
+
+    offences = YellingOffences(create_broken_db_session)
+    offences.record_offence(1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(offences.flush())
+
+    # The changed counts are written by the next successful flush
+    offences.create_db_session = create_db_session
+    offences.record_offence(2)
+    asyncio.run(offences.flush())
+    assert _database_bans(create_db_session) == {1: 1, 2: 1}
+
+
+def test_yelling_offences_flush_during_decay(
+    create_db_session: "sessionmaker[Session]", monkeypatch: pytest.MonkeyPatch
+):
+    offences = YellingOffences(create_db_session)
+    for _ in range(3):
+        offences.record_offence(1)
+    asyncio.run(offences.flush())
+
+    # Slow down flushes, so that an unserialised decay would be written first
+    write = offences._write  # pyright: ignore [reportPrivateUsage]
+
+    def slow_write(pending: Dict[int, int], decay: bool = False):
+        if not decay:
+            time.sleep(0.2)
+        write(pending, decay)
+
+    monkeypatch.setattr(offences, "_write", slow_write)
+
+    async def flush_and_decay():
+        # A flush that starts before a decay must not overwrite it with older counts
+        offences.record_offence(1)
+        await asyncio.gather(offences.flush(), offences.decay())
+
+    asyncio.run(flush_and_decay())
+    assert offences.offences(1) == 3
+    assert _database_bans(create_db_session) == {1: 3}
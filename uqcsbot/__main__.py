@@ -6,7 +6,8 @@ import discord
 from sqlalchemy import create_engine
 
 from uqcsbot.bot import UQCSBot
-from uqcsbot.models import Base
+from uqcsbot.models import Base, upgrade_database
+from uqcsbot.utils.uq_course_utils import course_cache
 
 description = "The helpful and always listening, UQCSbot."
 
@@ -78,7 +79,9 @@ async def main():
 
     db_engine = create_engine(database_uri, echo=True)
     Base.metadata.create_all(db_engine)
+    upgrade_database(db_engine)
     bot.set_db_engine(db_engine)
+    course_cache.use_database(bot.create_db_session)
 
     await bot.start(discord_token)
 
@@ -1,7 +1,7 @@
 import io
 import os
 from datetime import datetime, timedelta
-from random import choices
+from random import Random, SystemRandom
 from typing import Any, Callable, Dict, Iterable, List, Optional, Literal
 import requests
 from requests.exceptions import RequestException
@@ -24,8 +24,9 @@ from uqcsbot.utils.advent_utils import (
     HL_COLOUR,
     parse_leaderboard_column_string,
     build_leaderboard,
-    render_leaderboard_to_image,
-    render_leaderboard_to_text,
+    render_leaderboard_to_image_cached,
+    stream_leaderboard_text,
+    weighted_sample_without_replacement,
 )
 
 # Leaderboard API URL with placeholders for year and code.
@@ -141,8 +142,39 @@ leaderboards_for_month: Dict[SortingMethod, str] = {
 }
 
 
+class LeaderboardPageModal(discord.ui.Modal, title="Jump to page"):
+    """
+    A popup asking which page of a leaderboard to jump to.
+    """
+
+    def __init__(self, view: "LeaderboardView"):
+        super().__init__()
+        self.view = view
+        self.page_input: discord.ui.TextInput["LeaderboardPageModal"] = (
+            discord.ui.TextInput(default=str(view.page + 1), max_length=6)
+        )
+        self.add_item(
+            discord.ui.Label(
+                text=f"Page number (1-{view.page_count})", component=self.page_input
+            )
+        )
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            page = int(self.page_input.value) - 1
+        except ValueError:
+            await interaction.response.send_message(
+                f"`{self.page_input.value}` is not a page number.", ephemeral=True
+            )
+            return
+        self.view.page = min(max(page, 0), self.view.page_count - 1)
+        await interaction.response.edit_message(
+            **await self.view.make_message_arguments()
+        )
+
+
 class LeaderboardView(discord.ui.View):
-    TRUNCATED_COUNT = 20
+    PAGE_SIZE = 20
     TIMEOUT = timedelta(hours=24).total_seconds()
 
     def __init__(
@@ -166,25 +198,31 @@ class LeaderboardView(discord.ui.View):
         self.day = day
         self.all_members = members
         self.leaderboard_style = leaderboard_style
+        self.columns = parse_leaderboard_column_string(leaderboard_style, bot)
         self.sortby = sortby
         self.timestamp = datetime.now()
         self.basename = f"advent_{self.code}_{self.year}_{self.day}"
 
         # can be changed by interaction
-        self._visible_members = members[: self.TRUNCATED_COUNT]
+        self.page = 0
 
     @property
-    def is_truncated(self):
-        return len(self._visible_members) < len(self.all_members)
+    def page_count(self) -> int:
+        return max(1, -(-len(self.all_members) // self.PAGE_SIZE))
 
-    def _build_leaderboard(self, members: List[Member]) -> Leaderboard:
+    def _build_page(self) -> Leaderboard:
+        """
+        Builds the leaderboard for only the members on the current page.
+        """
+        start = self.page * self.PAGE_SIZE
         return build_leaderboard(
-            parse_leaderboard_column_string(self.leaderboard_style, self.bot),
-            members,
+            self.columns,
+            self.all_members[start : start + self.PAGE_SIZE],
             self.day,
+            start=start + 1,
         )
 
-    def make_message_arguments(self) -> Dict[str, Any]:
+    async def make_message_arguments(self) -> Dict[str, Any]:
         view_url = LEADERBOARD_VIEW_URL.format(year=self.year, code=self.code)
 
         title = (
@@ -199,10 +237,10 @@ class LeaderboardView(discord.ui.View):
         notes: List[str] = []
         if self.day:
             notes.append(f"sorted by {self.sortby}")
-        if self.is_truncated:
-            notes.append(
-                f"top {len(self._visible_members)} shown out of {len(self.all_members)}"
-            )
+        if self.page_count > 1:
+            start = self.page * self.PAGE_SIZE
+            end = min(start + self.PAGE_SIZE, len(self.all_members))
+            notes.append(f"{start + 1}-{end} shown out of {len(self.all_members)}")
         body = f"({', '.join(notes)})" if notes else ""
 
         embed = discord.Embed(
@@ -213,17 +251,15 @@ class LeaderboardView(discord.ui.View):
             timestamp=self.timestamp,
         )
 
-        leaderboard = self._build_leaderboard(self._visible_members)
-        scoreboard_image = render_leaderboard_to_image(tuple(leaderboard))
+        leaderboard = self._build_page()
+        scoreboard_image = await render_leaderboard_to_image_cached(leaderboard)
         file = discord.File(io.BytesIO(scoreboard_image), self.basename + ".png")
         embed.set_image(url=f"attachment://{file.filename}")
 
-        self.show_all_interaction.disabled = (
-            len(self.all_members) <= self.TRUNCATED_COUNT
-        )
-        self.show_all_interaction.label = (
-            "Show all" if self.is_truncated else "Show less"
-        )
+        self.previous_page_interaction.disabled = self.page == 0
+        self.next_page_interaction.disabled = self.page >= self.page_count - 1
+        self.jump_to_page_interaction.disabled = self.page_count == 1
+        self.jump_to_page_interaction.label = f"Page {self.page + 1}/{self.page_count}"
 
         return {
             "attachments": [file],
@@ -231,16 +267,25 @@ class LeaderboardView(discord.ui.View):
             "view": self,
         }
 
-    @discord.ui.button(label="Show all", style=discord.ButtonStyle.gray)
-    async def show_all_interaction(
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.gray)
+    async def previous_page_interaction(
         self, inter: discord.Interaction, btn: discord.ui.Button["LeaderboardView"]
     ):
-        self._visible_members = (
-            self.all_members
-            if self.is_truncated
-            else self.all_members[: self.TRUNCATED_COUNT]
-        )
-        await inter.response.edit_message(**self.make_message_arguments())
+        self.page = max(self.page - 1, 0)
+        await inter.response.edit_message(**await self.make_message_arguments())
+
+    @discord.ui.button(label="Page 1/1", style=discord.ButtonStyle.gray)
+    async def jump_to_page_interaction(
+        self, inter: discord.Interaction, btn: discord.ui.Button["LeaderboardView"]
+    ):
+        await inter.response.send_modal(LeaderboardPageModal(self))
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.gray)
+    async def next_page_interaction(
+        self, inter: discord.Interaction, btn: discord.ui.Button["LeaderboardView"]
+    ):
+        self.page = min(self.page + 1, self.page_count - 1)
+        await inter.response.edit_message(**await self.make_message_arguments())
 
     @discord.ui.button(label="Export as text", style=discord.ButtonStyle.gray)
     async def get_text_interaction(
@@ -249,9 +294,11 @@ class LeaderboardView(discord.ui.View):
         """
         Sends the text leaderboard as a file attachment within a new reply.
         """
-        leaderboard = self._build_leaderboard(self.all_members)
-        text = render_leaderboard_to_text(leaderboard)
-        file = discord.File(io.BytesIO(text.encode("utf-8")), self.basename + ".txt")
+        buffer = io.BytesIO()
+        for chunk in stream_leaderboard_text(self.columns, self.all_members, self.day):
+            buffer.write(chunk.encode("utf-8"))
+        buffer.seek(0)
+        file = discord.File(buffer, self.basename + ".txt")
         await inter.response.send_message(file=file)
 
         btn.disabled = True
@@ -451,25 +498,6 @@ class Advent(commands.Cog):
             db_session.commit()
             db_session.close()
 
-    def _random_choices_without_repition(
-        self, population: List[Member], weights: List[int], k: int
-    ) -> List[Member]:
-        """
-        Selects k people from a list of members, weighted by weights.
-        The weight of a person is like how many tickets they have for the lottery.
-        """
-        result: List[Member] = []
-        for _ in range(k):
-            if sum(weights) == 0:
-                return []
-
-            result.append(choices(population, weights)[0])
-            index = population.index(result[-1])
-            population.pop(index)
-            weights.pop(index)
-
-        return result
-
     @advent_command_group.command(name="help")
     @app_commands.describe(command="The command you want to view help about.")
     async def help_command(
@@ -555,6 +583,7 @@ The arguments for the command have a bit of nuance. They are as follow:
  `allow_repeat_winners    ` -  This allows participants to win multiple times from the same selection if `number_of_winners` is greater than 1. Note that regardless of this option, someone can win multiple times in a year, just not in a single selection.
  `allow_unregistered_users` - This allows Advent of Code accounts that do not have a linked discord account to win. Note that it can be difficult to give out prizes to users that do not have a linked discord.
  `year                    ` - The year the prize is for.
+ `seed                    ` - The seed for the random selection. The seed used is shown with the results, so that a selection can be repeated to verify it. Defaults to a new random seed.
                     """)
             case "remove-winner":
                 await interaction.response.send_message("""
@@ -648,7 +677,9 @@ The arguments for the command have a bit of nuance. They are as follow:
                 leaderboard_style,
                 sortby,
             )
-            await interaction.edit_original_response(**view.make_message_arguments())
+            await interaction.edit_original_response(
+                **await view.make_message_arguments()
+            )
 
     @advent_command_group.command(name="register")
     @app_commands.describe(
@@ -951,6 +982,7 @@ The arguments for the command have a bit of nuance. They are as follow:
         allow_unregistered_users="Allow winners to be selected from unregistered users. Defaults to False.",
         year="The year the prize is for. Defaults to the current year.",
         aoc_id="The AOC id of the winner to add, if selecting a winner. Use only if manually selecting a winner.",
+        seed="The seed for the random selection, to repeat a previous selection. Defaults to a new random seed.",
     )
     async def add_winners_command(
         self,
@@ -964,6 +996,7 @@ The arguments for the command have a bit of nuance. They are as follow:
         allow_unregistered_users: bool = False,
         year: Optional[int] = None,
         aoc_id: Optional[int] = None,
+        seed: Optional[int] = None,
     ):
         """
         Randomly choose (or select) winners from those who have completed challenges.
@@ -988,11 +1021,15 @@ The arguments for the command have a bit of nuance. They are as follow:
         registrations = self._get_registrations()
         registered_AOC_ids = [member.aoc_userid for member in registrations]
 
-        potential_winners = [
-            member
-            for member in self._get_members(year)
-            if any(member.attempted_day(day) for day in range(start, end + 1))
-        ]
+        # Sorted so that the selection for a seed does not depend on the API order
+        potential_winners = sorted(
+            (
+                member
+                for member in self._get_members(year)
+                if any(member.attempted_day(day) for day in range(start, end + 1))
+            ),
+            key=lambda member: member.id,
+        )
         if not allow_unregistered_users:
             potential_winners = [
                 member
@@ -1010,9 +1047,6 @@ The arguments for the command have a bit of nuance. They are as follow:
                 content=f"There were not enough eligible users to select winners (at least {required_number_of_potential_winners} needed; only {len(potential_winners)} found)."
             )
             return
-        number_of_potential_winners = len(
-            potential_winners
-        )  # potential winners will be changed ahead, so we store this value for the award message
 
         match weights:
             case "Stars":
@@ -1023,11 +1057,14 @@ The arguments for the command have a bit of nuance. They are as follow:
             case "Equal":
                 weight_values = [1 for _ in potential_winners]
 
+        if seed is None:
+            seed = SystemRandom().randrange(2**32)
+        rng = Random(seed)
         if allow_repeat_winners:
-            winners = choices(potential_winners, weight_values, k=number_of_winners)
+            winners = rng.choices(potential_winners, weight_values, k=number_of_winners)
         else:
-            winners = self._random_choices_without_repition(
-                potential_winners, weight_values, number_of_winners
+            winners = weighted_sample_without_replacement(
+                potential_winners, weight_values, number_of_winners, rng
             )
 
         if not winners:
@@ -1060,7 +1097,7 @@ The arguments for the command have a bit of nuance. They are as follow:
                 winners_message += " and "
 
         await interaction.edit_original_response(
-            content=f"The results are in! Out of {number_of_potential_winners} potential participants, {winners_message} have recieved a prize from participating in Advent of Code: {prize}",
+            content=f"The results are in! Out of {len(potential_winners)} potential participants, {winners_message} have recieved a prize from participating in Advent of Code: {prize} (seed {seed})",
             allowed_mentions=discord.AllowedMentions(
                 everyone=False, users=True, roles=False
             ),
@@ -1,4 +1,5 @@
 from typing import Optional
+import asyncio
 import logging
 from datetime import datetime
 import discord
@@ -11,12 +12,14 @@ from uqcsbot.utils.uq_course_utils import (
     CourseNotFoundException,
     ProfileNotFoundException,
     get_course_profile_url,
+    record_course_queries,
 )
+from uqcsbot.bot import UQCSBot
 from uqcsbot.yelling import yelling_exemptor
 
 
 class CourseECP(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: UQCSBot):
         self.bot = bot
 
     @app_commands.command()
@@ -70,6 +73,10 @@ class CourseECP(commands.Cog):
         except (CourseNotFoundException, ProfileNotFoundException) as exception:
             await interaction.edit_original_response(content=exception.message)
             return
+        # Only courses that were found are counted, so typos are never prefetched
+        await asyncio.to_thread(
+            record_course_queries, self.bot.create_db_session, course_name_urls
+        )
 
         # If year is none assign it the current year
         if not year:
@@ -106,5 +113,5 @@ class CourseECP(commands.Cog):
         return
 
 
-async def setup(bot: commands.Bot):
+async def setup(bot: UQCSBot):
     await bot.add_cog(CourseECP(bot))
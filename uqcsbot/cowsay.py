@@ -1,12 +1,12 @@
-from typing import Optional, Literal, List
-
-import re
+from collections import deque
+from typing import Deque, Dict, Optional, Literal, List, Tuple
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 from uqcsbot.bot import UQCSBot
+from uqcsbot.utils.text_utils import replace_emotes_with_names, sanitise_illegals
 from uqcsbot.yelling import yelling_exemptor
 
 # Max length of the message to be displayed per line in the bubble.
@@ -39,6 +39,64 @@ CowsayEyes = dict(
 )
 
 
+def _draw_cow(cow_eyes: str, tongue_out: bool, thinking: bool) -> str:
+    """
+    Returns cow ascii art with the given eyes, sticking out its tongue if requested.
+    """
+
+    # Set the bubble connection based on whether the cow is thinking or
+    # speaking.
+    bubble_connect = "o" if thinking else "\\"
+    tongue = "U" if tongue_out else " "
+
+    return (
+        f"        {bubble_connect}   ^__^\n"
+        f"         {bubble_connect}  ({cow_eyes})\\_______\n"
+        f"            (__)\\       )\\/\\ \n"
+        f"             {tongue}  ||----w |\n"
+        f"                ||     ||\n"
+    )
+
+
+def _draw_tux(cow_eyes: str, thinking: bool) -> str:
+    """
+    Returns tux ascii art with the given (cow) eyes.
+    """
+
+    tux_eyes = f"{cow_eyes[0]}_{cow_eyes[1]}"
+
+    # Set the bubble connection based on whether the tux is thinking or
+    # speaking.
+    bubble_connect = "o" if thinking else "\\"
+
+    return (
+        f"   {bubble_connect} \n"
+        f"    {bubble_connect} \n"
+        f"        .--. \n"
+        f"       |{tux_eyes} | \n"
+        f"       |:_/ | \n"
+        f"      //   \\ \\ \n"
+        f"     (|     | ) \n"
+        f"    /'\\_   _/`\\ \n"
+        f"    \\___)=(___/ \n"
+    )
+
+
+# Every cow and tux is drawn ahead of time, keyed by (mood, tongue out, thinking)
+# and (mood, thinking) respectively.
+CowsayCows: Dict[Tuple[str, bool, bool], str] = {
+    (mood, tongue_out, thinking): _draw_cow(cow_eyes, tongue_out, thinking)
+    for mood, cow_eyes in CowsayEyes.items()
+    for tongue_out in (False, True)
+    for thinking in (False, True)
+}
+CowsayTuxes: Dict[Tuple[str, bool], str] = {
+    (mood, thinking): _draw_tux(cow_eyes, thinking)
+    for mood, cow_eyes in CowsayEyes.items()
+    for thinking in (False, True)
+}
+
+
 class Cowsay(commands.Cog):
     def __init__(self, bot: UQCSBot):
         self.bot = bot
@@ -64,10 +122,10 @@ class Cowsay(commands.Cog):
         """
 
         # Sanitise invalid characters from the message
-        message = Cowsay.sanitise_illegals(message)
+        message = sanitise_illegals(message, "```", "'''")
 
         # Sanitise message for discord emotes
-        message = Cowsay.sanitise_emotes(message)
+        message = replace_emotes_with_names(message)
 
         # Check message length, if invalid send moo!
         if len(message) == 0 or len(message) > 1000:
@@ -107,10 +165,10 @@ class Cowsay(commands.Cog):
         """
 
         # Sanitise invalid characters from the message
-        message = Cowsay.sanitise_illegals(message)
+        message = sanitise_illegals(message, "```", "'''")
 
         # Sanitise message for discord emotes
-        message = Cowsay.sanitise_emotes(message)
+        message = replace_emotes_with_names(message)
 
         # Check message length, if invalid send moo!
         if len(message) == 0 or len(message) > 1000:
@@ -142,27 +200,12 @@ class Cowsay(commands.Cog):
         out its tongue when requested.
         """
 
-        # Set the tongue if the cow is dead or if the tongue is set to True.
-        tongue_out = "U" if tongue or mood == "Dead" else " "
-
-        # Set the bubble connection based on whether the cow is thinking or
-        # speaking.
-        bubble_connect = "o" if thinking else "\\"
-
         # Double check the mood is valid, default to normal if not.
         if mood not in CowsayEyes:
             mood = "Normal"
 
-        # Get the cow eyes.
-        cow_eyes = CowsayEyes[mood]
-
-        # Draw the cow.
-        cow = f"        {bubble_connect}   ^__^\n"
-        cow += f"         {bubble_connect}  ({cow_eyes})\\_______\n"
-        cow += f"            (__)\\       )\\/\\ \n"
-        cow += f"             {tongue_out}  ||----w |\n"
-        cow += f"                ||     ||\n"
-        return cow
+        # The cow sticks out its tongue if it is dead or if the tongue is set to True.
+        return CowsayCows[(mood, bool(tongue) or mood == "Dead", thinking)]
 
     def draw_tux(
         self, mood: Optional[CowsayMoodType] = "Normal", thinking: bool = False
@@ -175,57 +218,7 @@ class Cowsay(commands.Cog):
         if mood not in CowsayEyes:
             mood = "Normal"
 
-        # Get the tux eyes.
-        cow_eyes = CowsayEyes[mood]
-        tux_eyes = f"{cow_eyes[0]}_{cow_eyes[1]}"
-
-        # Set the bubble connection based on whether the tux is thinking or
-        # speaking.
-        bubble_connect = "o" if thinking else "\\"
-
-        # Draw the tux.
-        tux = f"   {bubble_connect} \n"
-        tux += f"    {bubble_connect} \n"
-        tux += f"        .--. \n"
-        tux += f"       |{tux_eyes} | \n"
-        tux += f"       |:_/ | \n"
-        tux += f"      //   \\ \\ \n"
-        tux += f"     (|     | ) \n"
-        tux += f"    /'\\_   _/`\\ \n"
-        tux += f"    \\___)=(___/ \n"
-        return tux
-
-    @staticmethod
-    def sanitise_illegals(message: str) -> str:
-        """
-        Replaces all illegal characters in the message with their sanitised
-        equivalent.
-        """
-
-        # Strip whitespace from either side of the message
-        message = message.strip()
-
-        # replace code blocks with their sanitised equivalent
-        message = message.replace("```", "'''")
-
-        return message
-
-    @staticmethod
-    def sanitise_emotes(message: str) -> str:
-        """
-        Replaces all emotes in the message with their emote name instead of
-        their id.
-        """
-
-        # Regex to match emotes.
-        emotes: List[str] = re.findall(r"<a?:\w+:\d+>", message)
-
-        # Replace each emote with its name.
-        for emote in emotes:
-            emote_name: str = emote.split(":")[1].strip()
-            message = message.replace(emote, f":{emote_name}:")
-
-        return message
+        return CowsayTuxes[(mood, thinking)]
 
     @staticmethod
     def word_wrap(message: str, wrap: int) -> List[str]:
@@ -235,49 +228,32 @@ class Cowsay(commands.Cog):
 
         lines: List[str] = []
         line: str = ""
-        words: List[str] = message.split()
+        # Words still to be processed. Leftover parts of words are put back at
+        # the front, so each word is handled in a single pass.
+        words: Deque[str] = deque(message.split())
 
-        index: int = 0
-        while index < len(words):
-            word: str = words[index]
-            index += 1
+        while words:
+            word: str = words.popleft()
 
             # As requested by the audience, you can manually break lines by
             # adding "\n" anywhere in the message and it will be respected.
             if "\\n" in word:
-                parts = word.split("\\n", 1)
-
-                # The `\n` is by itself, so start a new line.
-                if parts[0] == "" and parts[1] == "":
-                    lines.append(line.rstrip())
-                    line = ""
-                    continue
-                elif parts[1] == "":
-                    # The `\n` was at the end of the word, so add the current
-                    # part to the current line and start a new line
-                    lines.append((line + parts[0]).rstrip())
-                    line = ""
-                    continue
-                else:
-                    # The `\n` was in the middle of the word, or end. So add
-                    # the first part to the current line and start a new line.
-                    # Then add the second part to the list of words to be
-                    # processed.
-                    words.insert(index, parts[1])
-
-                    # Add the part to the current line and start a new line.
-                    lines.append((line + parts[0]).rstrip())
-                    line = ""
-                    continue
-
-            # If the word is longer than the wrap length, cut it and add it to
-            # the list of words to be processed.
+                before, after = word.split("\\n", 1)
+
+                # Add the part before the `\n` to the current line and start a
+                # new line. If the `\n` was in the middle of the word, the part
+                # after it is processed next.
+                lines.append((line + before).rstrip())
+                line = ""
+                if after:
+                    words.appendleft(after)
+                continue
+
+            # If the word is longer than the wrap length, cut it to the remaining
+            # space on the line and process the rest of the word next.
             if len(word) > wrap:
-                # Cut the word to the remaining space on the line.
                 cut_word = word[: (wrap - len(line))]
-
-                # Add the rest of the word to the list of words to be processed.
-                words.insert(index, word[len(cut_word) :])
+                words.appendleft(word[len(cut_word) :])
 
                 # Add the cut word to the current line and start a new line.
                 lines.append((line + cut_word).rstrip())
@@ -305,21 +281,16 @@ class Cowsay(commands.Cog):
         lines = Cowsay.word_wrap(message, wrap)
 
         # Get longest line
-        width = max([len(line) for line in lines])
+        width = max(map(len, lines))
 
         # Build the body of the speech bubble.
-        body = ""
         if thought:
             body = Cowsay.construct_thought_bubble_body(lines, width)
         else:
             body = Cowsay.construct_say_bubble_body(lines, width)
 
         # Construct the speech bubble.
-        bubble = f" _{width * '_'}_ \n"
-        bubble += body
-        bubble += f" -{width * '-'}- \n"
-
-        return bubble
+        return f" _{width * '_'}_ \n{body} -{width * '-'}- \n"
 
     @staticmethod
     def construct_say_bubble_body(lines: List[str], length: int) -> str:
@@ -327,17 +298,15 @@ class Cowsay(commands.Cog):
         Constructs a speech bubble body around the given message.
         """
 
-        # Build the body of the speech bubble.
-        body = ""
         if len(lines) == 1:
-            body += f"< {lines[0]} >\n"
-        else:
-            body += f"/ {lines[0].ljust(length)} \\\n"
-            for line in lines[1:-1]:
-                body += f"| {line.ljust(length)} |\n"
-            body += f"\\ {lines[-1].ljust(length)} /\n"
-
-        return body
+            return f"< {lines[0]} >\n"
+        return "".join(
+            [
+                f"/ {lines[0].ljust(length)} \\\n",
+                *(f"| {line.ljust(length)} |\n" for line in lines[1:-1]),
+                f"\\ {lines[-1].ljust(length)} /\n",
+            ]
+        )
 
     @staticmethod
     def construct_thought_bubble_body(lines: List[str], length: int) -> str:
@@ -345,12 +314,7 @@ class Cowsay(commands.Cog):
         Constructs a thought bubble body around the given message.
         """
 
-        # Build the body of the speech bubble.
-        body = ""
-        for line in lines:
-            body += f"( {line.ljust(length)} )\n"
-
-        return body
+        return "".join(f"( {line.ljust(length)} )\n" for line in lines)
 
 
 async def setup(bot: UQCSBot):
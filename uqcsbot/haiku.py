@@ -1,8 +1,25 @@
 import re
-from typing import Final, Dict, List, Tuple, cast
-from yaml import load, Loader
+from functools import lru_cache
+from collections import Counter
+from typing import (
+    Any,
+    Final,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    cast,
+)
+import yaml
+import hashlib
+import marshal
+import os
 import random
 import logging
+import sys
 
 import discord
 from discord import app_commands
@@ -11,7 +28,33 @@ from discord.ext import commands
 from uqcsbot.bot import UQCSBot
 from uqcsbot.yelling import yelling_exemptor
 
+# The C loader is much faster, but is only available if PyYAML was built with libyaml
+YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 SYLLABLE_RULES_PATH: Final[str] = "uqcsbot/static/syllable_rules.yaml"
+# A snapshot of the validated syllable rules, which is rebuilt whenever the rules change (see _load_syllable_rules).
+# It can be built ahead of time, which also validates the rules, by running `python -m uqcsbot.haiku`.
+SYLLABLE_RULES_SNAPSHOT_PATH: Final[str] = "uqcsbot/static/syllable_rules.snapshot"
+# Increase this whenever the format of the snapshot changes, so that older snapshots are rebuilt
+SYLLABLE_RULES_SNAPSHOT_VERSION: Final[int] = 1
+# The lists of prefixes and suffixes within the syllable rules
+AFFIX_RULE_NAMES: Final[Tuple[str, ...]] = (
+    "prefixes_needing_extra_syllable",
+    "prefixes_needing_extra_syllable_before_illegal_replacement",
+    "prefixes_needing_one_less_syllable",
+    "suffixes_needing_one_more_syllable",
+    "suffixes_needing_one_less_syllable",
+    "suffixes_to_remove",
+    "suffixes_to_remove_with_one_less_syllable",
+    "suffixes_to_remove_with_extra_syllable",
+)
+# The lists of suffixes that are removed to find a root word, in the order they are tried, and how many syllables
+# each suffix adds in addition to its vowel groups
+SUFFIX_REMOVAL_RULE_NAMES: Final[Dict[str, int]] = {
+    "suffixes_to_remove": 0,
+    "suffixes_to_remove_with_one_less_syllable": -1,
+    "suffixes_to_remove_with_extra_syllable": 1,
+}
 ALLOWED_CHANNEL_NAMES: Final[List[str]] = [
     "banter",
     "bot-testing",
@@ -22,6 +65,14 @@ ALLOWED_CHANNEL_NAMES: Final[List[str]] = [
     "yelling",
 ]
 YELLING_CHANNEL_NAME: Final[str] = "yelling"
+# Bounds on messages that could be a haiku, which are checked before counting any syllables.
+# Every word has at least one syllable, so a haiku (5 + 7 + 5 syllables) has between 3 and 17 words.
+HAIKU_MIN_WORDS: Final[int] = 3
+HAIKU_MAX_WORDS: Final[int] = 17
+# Generous enough for 17 long words with punctuation and a few emotes
+HAIKU_MAX_LENGTH: Final[int] = 400
+# The number of distinct words whose syllable counts are cached. Chat is dominated by a few thousand common words.
+SYLLABLE_CACHE_SIZE: Final[int] = 4096
 HAIKU_BASE_PROBABILITY: float = 0.4
 # How much "more likely" (as determined by _increase_probability) a haiku is if it has punctuation at the end of a line.
 HAIKU_PUNCTUATION_PROBABILITY_INCREASE: float = 1.6
@@ -36,6 +87,148 @@ HAIKU_FAVOURITE_WORD_LIST: Dict[str, float] = {
     "poems": 2,
 }
 
+VOWELS: Final[Tuple[str, ...]] = ("a", "e", "i", "o", "u")
+_VOWEL_GROUP_REGEX: Final[re.Pattern[str]] = re.compile("[aeiouy]+")
+# Stolen from https://www.freecodecamp.org/news/how-to-use-regex-to-match-emoji-including-discord-emotes/
+_EMOTE_REGEX: Final[re.Pattern[str]] = re.compile(r"<a?:\w+:[0-9]+>")
+_NON_ALPHABETIC_REGEX: Final[re.Pattern[str]] = re.compile("[^a-z]+")
+# "Words" that have at least one syllable. Others (such as punctuation and emotes, once removed) are skipped by _find_haiku.
+_SYLLABIC_WORD_REGEX: Final[re.Pattern[str]] = re.compile(r"\S*[A-Za-z]\S*")
+
+
+class _AffixTrie:
+    """
+    A trie of affixes, used to find which affixes a word starts with (or ends with, if reversed) in a
+    single pass over the start (or end) of the word. This takes time depending on the length of the
+    longest affix, rather than the number of affixes.
+    """
+
+    def __init__(self, affixes: Iterable[str], reverse: bool = False):
+        self.reverse = reverse
+        # Each node is an index into these lists. Node 0 is the root (the empty affix).
+        self._children: List[Dict[str, int]] = [{}]
+        # The indices (in the given order) of the affixes that end at each node
+        self._affix_indices: List[List[int]] = [[]]
+        for affix_index, affix in enumerate(affixes):
+            node = 0
+            for letter in reversed(affix) if reverse else affix:
+                if letter not in self._children[node]:
+                    self._children[node][letter] = len(self._children)
+                    self._children.append({})
+                    self._affix_indices.append([])
+                node = self._children[node][letter]
+            self._affix_indices[node].append(affix_index)
+
+    def find(self, word: str) -> Iterator[int]:
+        """
+        Yields the indices of all the affixes that the word starts with (or ends with, if reversed),
+        from shortest to longest.
+        """
+        node = 0
+        yield from self._affix_indices[node]
+        for letter in reversed(word) if self.reverse else word:
+            if (child := self._children[node].get(letter)) is None:
+                return
+            node = child
+            yield from self._affix_indices[node]
+
+    def matches(self, word: str) -> bool:
+        """Whether the word starts with (or ends with, if reversed) any of the affixes."""
+        return next(self.find(word), None) is not None
+
+
+class SyllableRulesError(Exception):
+    """
+    Raised when the syllable rules do not follow the required format.
+    """
+
+
+def _validate_syllable_rules(
+    syllable_rules: Any,
+) -> Tuple[Dict[str, Tuple[str, ...]], Dict[str, int], Dict[str, str]]:
+    """
+    Checks that the parsed syllable rules follow the required format, raising a SyllableRulesError if they do not.
+    Returns the affixes (as tuples), syllable exceptions and accent replacements.
+    """
+    if not isinstance(syllable_rules, dict):
+        raise SyllableRulesError("the rules must be a mapping of rule names")
+    syllable_rules = cast(Dict[Any, Any], syllable_rules)
+    if unknown_rules := syllable_rules.keys() - {
+        *AFFIX_RULE_NAMES,
+        "exceptions",
+        "accents",
+    }:
+        raise SyllableRulesError(f"unknown rules {sorted(map(str, unknown_rules))}")
+
+    rule_affixes: Dict[str, Tuple[str, ...]] = {}
+    for rule_name in AFFIX_RULE_NAMES:
+        rule_specification = syllable_rules.get(rule_name)
+        if not isinstance(rule_specification, list) or not all(
+            isinstance(affix, str) for affix in cast(List[Any], rule_specification)
+        ):
+            raise SyllableRulesError(f"{rule_name} must be a list of strings")
+        # beginswith and endswith both require tuples, so turn all lists into tuples
+        rule_affixes[rule_name] = tuple(cast(List[str], rule_specification))
+
+    exceptions = syllable_rules.get("exceptions")
+    if not isinstance(exceptions, dict) or not all(
+        isinstance(word, str) and type(count) is int
+        for word, count in cast(Dict[Any, Any], exceptions).items()
+    ):
+        raise SyllableRulesError(
+            "exceptions must be a mapping of words to numbers of syllables"
+        )
+
+    accents = syllable_rules.get("accents")
+    if not isinstance(accents, dict) or not all(
+        isinstance(letter, str) and len(letter) == 1 and isinstance(replacement, str)
+        for letter, replacement in cast(Dict[Any, Any], accents).items()
+    ):
+        raise SyllableRulesError(
+            "accents must be a mapping of single letters to their replacements"
+        )
+
+    return (
+        rule_affixes,
+        cast(Dict[str, int], exceptions),
+        cast(Dict[str, str], accents),
+    )
+
+
+def _load_syllable_rules(
+    rules_path: str = SYLLABLE_RULES_PATH,
+    snapshot_path: str = SYLLABLE_RULES_SNAPSHOT_PATH,
+) -> Tuple[Dict[str, Tuple[str, ...]], Dict[str, int], Dict[str, str]]:
+    """
+    Loads and validates the syllable rules (see _validate_syllable_rules).
+    The validated rules are kept in a snapshot (using marshal) along with a hash of the YAML they came from,
+    so that the YAML only needs to be parsed again when it changes.
+    """
+    with open(rules_path, "rb") as rules_file:
+        source = rules_file.read()
+    source_hash = hashlib.sha256(
+        SYLLABLE_RULES_SNAPSHOT_VERSION.to_bytes(4, "big") + source
+    ).hexdigest()
+
+    try:
+        with open(snapshot_path, "rb") as snapshot_file:
+            snapshot_hash, snapshot_rules = marshal.load(snapshot_file)
+        if snapshot_hash == source_hash:
+            return snapshot_rules
+    except (OSError, EOFError, ValueError, TypeError):
+        # There is no snapshot or it is unreadable, so build a new one
+        pass
+
+    syllable_rules = _validate_syllable_rules(yaml.load(source, Loader=YAMLLoader))
+    try:
+        with open(snapshot_path + ".tmp", "wb") as snapshot_file:
+            marshal.dump((source_hash, syllable_rules), snapshot_file)
+        os.replace(snapshot_path + ".tmp", snapshot_path)
+    except OSError as e:
+        logging.warning(f"Could not write the syllable rules snapshot: {e}")
+    return syllable_rules
+
+
 # The following should be treated like constants after they are loaded in
 # Affixes should contain all prefix, suffix and infix lists as tuples, as it is easier to work with beginswith and endswith
 affixes: Dict[str, Tuple[str, ...]] = {}
@@ -43,26 +236,40 @@ affixes: Dict[str, Tuple[str, ...]] = {}
 syllable_exceptions: Dict[str, int] = {}
 # Accents and "equivalent" characters that they should be replaced with for syllable counting purposes
 accent_replacements: Dict[str, str] = {}
+# A str.translate table of accent_replacements
+accent_table: Dict[int, str] = {}
+# Tries of the prefix and suffix lists in affixes (suffix tries are reversed)
+affix_tries: Dict[str, _AffixTrie] = {}
+# The suffixes that are removed to find a root word (see _remove_suffixes), in the order they are tried.
+# Each suffix has the number of syllables it adds and whether it is only removed after a consonant.
+suffix_removal_rules: List[Tuple[str, int, bool]] = []
+suffix_removal_trie = _AffixTrie([], reverse=True)
+# Why the syllable rules could not be loaded, if they could not be
+syllable_rules_error: Optional[str] = None
 
 try:
-    with open(SYLLABLE_RULES_PATH, "r", encoding="utf-8") as syllable_rules_file:
-        syllable_rules = load(syllable_rules_file, Loader=Loader)
-    # beginswith and endswith both require tuples, so turn all lists into tuples
-    for rule_name, rule_specification in syllable_rules.items():
-        if isinstance(rule_specification, list):
-            affixes[rule_name] = tuple(rule_specification)  # type: ignore
-        elif isinstance(rule_specification, dict):
-            match rule_name:
-                case "exceptions":
-                    syllable_exceptions = cast(Dict[str, int], rule_specification)
-                case "accents":
-                    accent_replacements = cast(Dict[str, str], rule_specification)
-                case _:
-                    # We will catch this on __init__ of the cog. We cannot deal with this error now via FatalErrorWithLog, as the bot may not have loaded enough
-                    pass
-except:
+    affixes, syllable_exceptions, accent_replacements = _load_syllable_rules()
+except (OSError, yaml.YAMLError, SyllableRulesError) as e:
     # We will catch this on __init__ of the cog. We cannot deal with this error now via FatalErrorWithLog, as the bot may not have loaded enough
-    pass
+    syllable_rules_error = f"{type(e).__name__}: {e}"
+else:
+    accent_table = str.maketrans(accent_replacements)
+    affix_tries = {
+        rule_name: _AffixTrie(rule_affixes, reverse=rule_name.startswith("suffixes"))
+        for rule_name, rule_affixes in affixes.items()
+    }
+    suffix_removal_rules = [
+        (
+            suffix,
+            len(_VOWEL_GROUP_REGEX.findall(suffix)) + syllable_adjustment,
+            rule_name == "suffixes_to_remove_with_one_less_syllable",
+        )
+        for rule_name, syllable_adjustment in SUFFIX_REMOVAL_RULE_NAMES.items()
+        for suffix in affixes[rule_name]
+    ]
+    suffix_removal_trie = _AffixTrie(
+        (suffix for suffix, _, _ in suffix_removal_rules), reverse=True
+    )
 
 
 class Haiku(commands.Cog):
@@ -72,39 +279,65 @@ class Haiku(commands.Cog):
 
     def __init__(self, bot: UQCSBot):
         self.bot = bot
-        if affixes == {} or syllable_exceptions == {} or accent_replacements == {}:
+        if syllable_rules_error is not None:
             raise RuntimeError(
-                f"The syllable rules (used for haiku detection) could not be found in {SYLLABLE_RULES_PATH} or did not follow the required format. Haiku detection will not work."
+                f"The syllable rules (used for haiku detection) could not be loaded from {SYLLABLE_RULES_PATH} ({syllable_rules_error}). Haiku detection will not work."
             )
-        # Initially set allowed_channels to be empty incase a message is recived before on_ready has completed
-        self.allowed_channels = []
+        # Initially set allowed_channel_ids to be empty incase a message is recived before on_ready has completed
+        self.allowed_channel_ids: Set[int] = set()
+        self.yelling_channel_id = 0
+        # The number of messages rejected at each stage of haiku detection (see on_message)
+        self.rejections: Counter[str] = Counter()
+
+    async def cog_unload(self):
+        cache_info = _number_of_syllables_in_lowercase_word.cache_info()
+        logging.info(
+            f"Syllable cache: {cache_info.hits} hits, {cache_info.misses} misses ({_syllable_cache_hit_rate():.1%} hit rate)"
+        )
+        logging.info(
+            f"Messages rejected as haiku at each stage: {dict(self.rejections)}"
+        )
 
     @commands.Cog.listener()
     async def on_ready(self):
         # As channels aren't ready when __init__() is called
-        self.allowed_channels = [
-            discord.utils.get(self.bot.uqcs_server.channels, name=channel_name)
+        self.allowed_channel_ids = {
+            channel.id
             for channel_name in ALLOWED_CHANNEL_NAMES
-        ]
+            if (
+                channel := discord.utils.get(
+                    self.bot.uqcs_server.channels, name=channel_name
+                )
+            )
+        }
+        yelling_channel = discord.utils.get(
+            self.bot.uqcs_server.channels, name=YELLING_CHANNEL_NAME
+        )
+        self.yelling_channel_id = yelling_channel.id if yelling_channel else 0
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        if (
-            message.channel not in self.allowed_channels
-            or message.author.bot
-            or "```" in message.content
-        ):
+        # Each stage is more expensive than the last, and most messages are rejected before counting syllables
+        if message.channel.id not in self.allowed_channel_ids:
+            self.rejections["channel"] += 1
+            return
+        if message.author.bot or "```" in message.content:
+            self.rejections["author or code"] += 1
+            return
+        if not _could_be_haiku(message.content):
+            self.rejections["length"] += 1
             return
-
         haiku_lines, probability_of_showing_haiku = _find_haiku(message.content)
-        if not haiku_lines or random.random() > probability_of_showing_haiku:
+        if not haiku_lines:
+            self.rejections["syllables"] += 1
+            return
+        if random.random() > probability_of_showing_haiku:
+            self.rejections["probability"] += 1
             return
 
         haiku_lines = ["> " + line for line in haiku_lines]
         haiku = "\n".join(haiku_lines)
-        if message.channel == discord.utils.get(
-            self.bot.uqcs_server.channels, name=YELLING_CHANNEL_NAME
-        ):
+        if message.channel.id == self.yelling_channel_id:
             await message.reply(f"Nice haiku:\n{haiku}".upper())
         else:
             await message.reply(f"Nice haiku:\n{haiku}")
@@ -128,6 +361,17 @@ class Haiku(commands.Cog):
             )
 
 
+def _could_be_haiku(text: str) -> bool:
+    """
+    Cheaply checks whether a message is short enough and has the right number of words to be a haiku,
+    without counting any syllables.
+    """
+    if len(text) > HAIKU_MAX_LENGTH:
+        return False
+    number_of_words = len(_SYLLABIC_WORD_REGEX.findall(_EMOTE_REGEX.sub(" ", text)))
+    return HAIKU_MIN_WORDS <= number_of_words <= HAIKU_MAX_WORDS
+
+
 def _find_haiku(text: str):
     """
     Finds a haiku and a related "probability" that something is a haiku.
@@ -147,8 +391,9 @@ def _find_haiku(text: str):
         """
         return 1 - (1 - probability) ** index
 
-    for word in text.split():
-        number_of_syllables = _number_of_syllables_in_word(word)
+    # Lowercase the whole message at once; this never moves whitespace, so the words line up
+    for word, lowercase_word in zip(text.split(), text.lower().split()):
+        number_of_syllables = _number_of_syllables_in_lowercase_word(lowercase_word)
 
         # Remove all space-separated punctuation and emotes
         if number_of_syllables == 0:
@@ -166,9 +411,9 @@ def _find_haiku(text: str):
             return False, 0
 
         current_line.append(word)
-        if word.lower() in HAIKU_FAVOURITE_WORD_LIST:
+        if lowercase_word in HAIKU_FAVOURITE_WORD_LIST:
             probability = _increased_probability(
-                probability, HAIKU_FAVOURITE_WORD_LIST[word.lower()]
+                probability, HAIKU_FAVOURITE_WORD_LIST[lowercase_word]
             )
 
         syllable_count += number_of_syllables
@@ -197,33 +442,78 @@ def _number_of_vowel_groups(word: str):
     Each vowel can only be part of one vowel group and distinct vowel groups must be separated by a non-vowel character.
     The letter "y" is included as a vowel.
     """
-    return len(re.findall("[aeiouy]+", word))
+    return len(_VOWEL_GROUP_REGEX.findall(word))
+
+
+def _remove_suffixes(word: str) -> Tuple[str, int]:
+    """
+    Removes suffixes (from suffix_removal_rules) so we can focus on the syllables of the root word, but only
+    if it is a true suffix (checked by testing if there is another vowel without the suffix). Suffixes are
+    tried in order, and a suffix can only be removed after the suffixes before it.
+    Returns the root word and the number of syllables in the removed suffixes.
+    """
+    number_of_syllables = 0
+    last_rule_index = -1
+    while True:
+        # Suffixes may also be followed by "s"
+        matching_rule_indices = set(suffix_removal_trie.find(word))
+        if word.endswith("s"):
+            matching_rule_indices.update(suffix_removal_trie.find(word[:-1]))
+        for rule_index in sorted(matching_rule_indices):
+            if rule_index <= last_rule_index:
+                continue
+            suffix, suffix_syllables, only_after_consonant = suffix_removal_rules[
+                rule_index
+            ]
+            root = word.removesuffix(suffix).removesuffix(suffix + "s")
+            if _number_of_vowel_groups(root) > 0 and not (
+                only_after_consonant and root.endswith(VOWELS)
+            ):
+                word = root
+                number_of_syllables += suffix_syllables
+                last_rule_index = rule_index
+                break
+        else:
+            return word, number_of_syllables
 
 
 def _number_of_syllables_in_word(word: str) -> int:
     """
     Estimate the number of syllables in a word.
+    The count only depends on the lowercase word, so counts are cached by it (see _syllable_cache_hit_rate).
+    """
+    return _number_of_syllables_in_lowercase_word(word.lower())
+
+
+def _syllable_cache_hit_rate() -> float:
+    """
+    The proportion of syllable counts that have been found in the cache, rather than calculated.
+    """
+    cache_info = _number_of_syllables_in_lowercase_word.cache_info()
+    lookups = cache_info.hits + cache_info.misses
+    return cache_info.hits / lookups if lookups else 0
+
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
+def _number_of_syllables_in_lowercase_word(word: str) -> int:
+    """
+    Estimate the number of syllables in a lowercase word.
     Inspired off the algorithm from this website: https://eayd.in/?p=232
     Also the tool https://www.dcode.fr/word-search-regexp is useful at finding words and counterexamples
     """
 
     number_of_syllables = 0
 
-    word = word.lower()
-    # Get rid of emotes. Stolen from https://www.freecodecamp.org/news/how-to-use-regex-to-match-emoji-including-discord-emotes/
-    word = re.sub("<a?:.+?:[0-9]+?>", " ", word)
+    # Get rid of emotes
+    word = _EMOTE_REGEX.sub(" ", word)
 
-    if word.startswith(
-        affixes["prefixes_needing_extra_syllable_before_illegal_replacement"]
-    ):
+    if affix_tries[
+        "prefixes_needing_extra_syllable_before_illegal_replacement"
+    ].matches(word):
         number_of_syllables += 1
 
-    # Replace "illegals" (non-alphabetic characters)
-    for i, letter in enumerate(word):
-        if letter in accent_replacements:
-            unaccented_letter = accent_replacements[letter]
-            # Note that unaccented letter may be more than one character (eg "æ" goes to "ae")
-            word = word[:i] + unaccented_letter + word[i + len(unaccented_letter) :]
+    # Replace "illegals" (non-alphabetic characters). Note that an unaccented letter may be more than one character (eg "æ" goes to "ae")
+    word = word.translate(accent_table)
     # Words ending in "'s" are similar to pluralising a word. If the word ends in "ch", "s" or "sh" then we add "es", otherwise we just add "s"
     if word.endswith("'s"):
         word = word.removesuffix("'s")
@@ -231,7 +521,7 @@ def _number_of_syllables_in_word(word: str) -> int:
             word += "es"
         else:
             word += "s"
-    word = re.sub("[^a-z]+", " ", word)
+    word = _NON_ALPHABETIC_REGEX.sub(" ", word)
     word = word.strip()
     if word == "":
         return 0
@@ -243,43 +533,8 @@ def _number_of_syllables_in_word(word: str) -> int:
     if _number_of_vowel_groups(word) == 0:
         return len(word.replace(" ", ""))
 
-    # Remove suffixes so we can focus on the syllables of the root word, but only if it is a true suffix (checked by testing if there is another vowel without the suffix)
-    for suffix in affixes["suffixes_to_remove"]:
-        if (
-            word.endswith((suffix, suffix + "s"))
-            and _number_of_vowel_groups(
-                word.removesuffix(suffix).removesuffix(suffix + "s")
-            )
-            > 0
-        ):
-            word = word.removesuffix(suffix).removesuffix(suffix + "s")
-            number_of_syllables += _number_of_vowel_groups(suffix)
-    for suffix in affixes["suffixes_to_remove_with_one_less_syllable"]:
-        if (
-            word.endswith((suffix, suffix + "s"))
-            and _number_of_vowel_groups(
-                word.removesuffix(suffix).removesuffix(suffix + "s")
-            )
-            > 0
-            and not word.removesuffix(suffix)
-            .removesuffix(suffix + "s")
-            .endswith(("a", "e", "i", "o", "u"))
-        ):
-            word = word.removesuffix(suffix).removesuffix(suffix + "s")
-            number_of_syllables += _number_of_vowel_groups(suffix)
-            number_of_syllables -= 1
-    for suffix in affixes["suffixes_to_remove_with_extra_syllable"]:
-        if (
-            word.endswith((suffix, suffix + "s"))
-            and _number_of_vowel_groups(
-                word.removesuffix(suffix).removesuffix(suffix + "s")
-            )
-            > 0
-        ):
-            word = word.removesuffix(suffix).removesuffix(suffix + "s")
-            number_of_syllables += _number_of_vowel_groups(suffix)
-            number_of_syllables += 1
-
+    word, suffix_syllables = _remove_suffixes(word)
+    number_of_syllables += suffix_syllables
     number_of_syllables += _number_of_vowel_groups(word)
 
     # Before removing s, note that "s" adds a syllable to words ending in "ce", "ge", "se", "ches", "shes" and "aises" such as "sentences", "ages", "houses", "batches", "hashes" and "raises"
@@ -315,13 +570,13 @@ def _number_of_syllables_in_word(word: str) -> int:
         number_of_syllables += 1
 
     # Deal with exceptions from the given prefix and suffix lists
-    if word.startswith(affixes["prefixes_needing_extra_syllable"]):
+    if affix_tries["prefixes_needing_extra_syllable"].matches(word):
         number_of_syllables += 1
-    if word.startswith(affixes["prefixes_needing_one_less_syllable"]):
+    if affix_tries["prefixes_needing_one_less_syllable"].matches(word):
         number_of_syllables -= 1
-    if word.endswith(affixes["suffixes_needing_one_more_syllable"]):
+    if affix_tries["suffixes_needing_one_more_syllable"].matches(word):
         number_of_syllables += 1
-    if word.endswith(affixes["suffixes_needing_one_less_syllable"]):
+    if affix_tries["suffixes_needing_one_less_syllable"].matches(word):
         number_of_syllables -= 1
 
     return number_of_syllables
@@ -332,3 +587,12 @@ async def setup(bot: UQCSBot):
         await bot.add_cog(Haiku(bot))
     except RuntimeError as e:
         logging.error(e)
+
+
+if __name__ == "__main__":
+    # Validates the syllable rules and builds their snapshot (which happens as this module is loaded)
+    if syllable_rules_error is not None:
+        sys.exit(
+            f"Invalid syllable rules in {SYLLABLE_RULES_PATH}: {syllable_rules_error}"
+        )
+    print(f"Built the syllable rules snapshot at {SYLLABLE_RULES_SNAPSHOT_PATH}")
@@ -4,9 +4,11 @@ from sqlalchemy import (
     Boolean,
     Date,
     DateTime,
+    Engine,
     Integer,
     String,
     Time,
+    text,
 )
 from typing import Optional
 from datetime import datetime
@@ -39,6 +41,34 @@ class AOCRegistrations(Base):
     )  # Try to remove this column from the database at some point
 
 
+class CourseCacheEntries(Base):
+    __tablename__ = "course_cache"
+
+    # The kind of information (e.g. "profile_url"), and the course and offering it is for
+    kind: Mapped[str] = mapped_column("kind", String, primary_key=True, nullable=False)
+    course_code: Mapped[str] = mapped_column(
+        "course_code", String, primary_key=True, nullable=False
+    )
+    offering_code: Mapped[str] = mapped_column(
+        "offering_code", String, primary_key=True, nullable=False
+    )
+    # JSON encoded, or null if the information could not be found
+    value: Mapped[Optional[str]] = mapped_column("value", String, nullable=True)
+    expires: Mapped[datetime] = mapped_column("expires", DateTime, nullable=False)
+
+
+class CourseQueries(Base):
+    __tablename__ = "course_queries"
+
+    course_code: Mapped[str] = mapped_column(
+        "course_code", String, primary_key=True, nullable=False
+    )
+    count: Mapped[int] = mapped_column("count", BigInteger, nullable=False)
+    last_queried: Mapped[datetime] = mapped_column(
+        "last_queried", DateTime, nullable=False
+    )
+
+
 class MCWhitelist(Base):
     __tablename__ = "mc_whitelisted"
 
@@ -53,8 +83,17 @@ class MCWhitelist(Base):
 class Reminders(Base):
     __tablename__ = "reminders"
 
-    id: Mapped[int] = mapped_column("id", BigInteger, primary_key=True, nullable=False)
-    user_id: Mapped[int] = mapped_column("user_id", BigInteger, nullable=False)
+    # SQLite only autoincrements INTEGER primary keys
+    id: Mapped[int] = mapped_column(
+        "id",
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        nullable=False,
+        autoincrement=True,
+    )
+    user_id: Mapped[int] = mapped_column(
+        "user_id", BigInteger, nullable=False, index=True
+    )
     channel_id: Mapped[Optional[int]] = mapped_column(
         "channel_id", BigInteger, nullable=True
     )
@@ -94,3 +133,67 @@ class YellingBans(Base):
         "user_id", BigInteger, primary_key=True, nullable=False
     )
     value: Mapped[int] = mapped_column("value", BigInteger, nullable=False)
+
+
+def upgrade_database(db_engine: Engine):
+    """
+    Brings tables created by older versions of the bot up to date, as create_all only
+    creates missing tables and never changes existing ones. This is safe to run on
+    every start, after create_all.
+    """
+    with db_engine.begin() as connection:
+        # Reminder ids used to be chosen by the bot rather than the database. SQLite only
+        # allocates ids for INTEGER primary keys, and older tables have a BIGINT id, so
+        # they are rebuilt. New ids then continue on from the largest existing id.
+        if connection.dialect.name == "sqlite":
+            id_type = connection.execute(
+                text(
+                    "SELECT type FROM pragma_table_info('reminders') WHERE name = 'id'"
+                )
+            ).scalar()
+            if id_type is not None and id_type.upper() != "INTEGER":
+                reminders = Base.metadata.tables[Reminders.__tablename__]
+                columns = ", ".join(column.name for column in reminders.columns)
+                for index in reminders.indexes:
+                    index.drop(connection, checkfirst=True)
+                connection.execute(
+                    text("ALTER TABLE reminders RENAME TO reminders_old")
+                )
+                reminders.create(connection)
+                connection.execute(
+                    text(
+                        f"INSERT INTO reminders ({columns}) "
+                        f"SELECT {columns} FROM reminders_old"
+                    )
+                )
+                connection.execute(text("DROP TABLE reminders_old"))
+
+        # Reminders.user_id was not always indexed
+        for index in Base.metadata.tables[Reminders.__tablename__].indexes:
+            index.create(connection, checkfirst=True)
+
+        # On PostgreSQL, the id sequence needs to be moved past the existing ids.
+        if connection.dialect.name == "postgresql":
+            sequence = connection.execute(
+                text("SELECT pg_get_serial_sequence('reminders', 'id')")
+            ).scalar()
+            if sequence is None:
+                connection.execute(
+                    text(
+                        "CREATE SEQUENCE IF NOT EXISTS reminders_id_seq OWNED BY reminders.id"
+                    )
+                )
+                connection.execute(
+                    text(
+                        "ALTER TABLE reminders ALTER COLUMN id SET DEFAULT nextval('reminders_id_seq')"
+                    )
+                )
+                sequence = "reminders_id_seq"
+            connection.execute(
+                text(
+                    "SELECT setval(:sequence, GREATEST("
+                    "(SELECT COALESCE(MAX(id), 0) FROM reminders) + 1, nextval(:sequence)"
+                    "), false)"
+                ),
+                {"sequence": sequence},
+            )
@@ -1,12 +1,15 @@
-from typing import List
-
-import re
-
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 from uqcsbot.bot import UQCSBot
+from uqcsbot.utils.text_utils import (
+    deletion_table,
+    replace_emotes_with_names,
+    sanitise_illegals,
+    send_split_message,
+    substitution_table,
+)
 from uqcsbot.yelling import yelling_exemptor
 
 # value of all valid ascii values in morse code
@@ -64,6 +67,11 @@ MorseCodeDict = {
     "+": ". _ . _ . ",
 }
 
+# str.translate tables for encrypting to morse code, and for removing valid characters
+# (leaving only those that can't be encrypted)
+MorseEncryptTable = substitution_table(MorseCodeDict, suffix="  ")
+MorseInvalidTable = deletion_table("".join(MorseCodeDict))
+
 
 class Morse(commands.Cog):
     def __init__(self, bot: UQCSBot):
@@ -80,10 +88,10 @@ class Morse(commands.Cog):
         """
 
         # Sanitise invalid characters from the message
-        message = Morse.sanitise_illegals(message)
+        message = sanitise_illegals(message)
 
         # Sanitise message for discord emotes
-        message = Morse.sanitise_emotes(message)
+        message = replace_emotes_with_names(message)
 
         # Convert all chars to lower case
         message = message.upper()
@@ -96,64 +104,17 @@ class Morse(commands.Cog):
             )
             return
 
-        # encrypt message
-        response = Morse.encrypt_to_morse(message)
-
-        # Check if response is too long
-        if len(response) > 2000:
-            await interaction.response.send_message("Resulting message too long!")
-            return
-
-        await interaction.response.send_message(response)
-
-    @staticmethod
-    def sanitise_illegals(message: str) -> str:
-        """
-        Replaces all illegal characters in the message with their sanitised
-        equivalent.
-        """
-
-        # Strip whitespace from either side of the message
-        message = message.strip()
-
-        # replace code blocks with their sanitised equivalent
-        message = message.replace("`", "")
-
-        return message
-
-    @staticmethod
-    def sanitise_emotes(message: str) -> str:
-        """
-        Replaces all emotes in the message with their emote name instead of
-        their id.
-        """
-
-        # Regex to match emotes.
-        emotes: List[str] = re.findall(r"<a?:\w+:\d+>", message)
-
-        # Replace each emote with its name.
-        for emote in emotes:
-            emote_name: str = emote.split(":")[1].strip()
-            message = message.replace(emote, f":{emote_name}:")
-
-        return message
+        # encrypt message, sending it over multiple messages if it is too long
+        await send_split_message(interaction, Morse.encrypt_to_morse(message))
 
     @staticmethod
     def check(message: str) -> str:
-        ret = ""
-        for letter in message:
-            if letter not in MorseCodeDict:
-                ret += letter
-        if len(ret) != 0:
-            return ret
-        return ""
+        """Returns the characters in the message that have no morse code."""
+        return message.translate(MorseInvalidTable)
 
     @staticmethod
     def encrypt_to_morse(message: str) -> str:
-        cipher = ""
-        for letter in message:
-            cipher += MorseCodeDict[letter] + "  "
-        return cipher
+        return message.translate(MorseEncryptTable)
 
 
 async def setup(bot: UQCSBot):
@@ -1,4 +1,5 @@
 from typing import Optional, Literal
+import asyncio
 import logging
 from random import choice
 
@@ -10,14 +11,16 @@ from uqcsbot.utils.uq_course_utils import (
     get_past_exams,
     get_past_exams_page_url,
     HttpException,
+    record_course_queries,
 )
+from uqcsbot.bot import UQCSBot
 from uqcsbot.yelling import yelling_exemptor
 
 SemesterType = Optional[Literal["Sem 1", "Sem 2", "Summer"]]
 
 
 class PastExams(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: UQCSBot):
         self.bot = bot
 
     @app_commands.command()
@@ -56,6 +59,10 @@ class PastExams(commands.Cog):
                 content=f"No past exams could be found for {course_code}."
             )
             return
+        # Only courses with past exams are counted, so typos are never prefetched
+        await asyncio.to_thread(
+            record_course_queries, self.bot.create_db_session, [course_code]
+        )
 
         if semester:
             past_exams = list(
@@ -107,5 +114,5 @@ class PastExams(commands.Cog):
         await interaction.edit_original_response(embed=embed)
 
 
-async def setup(bot: commands.Bot):
+async def setup(bot: UQCSBot):
     await bot.add_cog(PastExams(bot))
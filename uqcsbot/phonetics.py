@@ -1,3 +1,6 @@
+import re
+from typing import Dict
+
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -5,8 +8,9 @@ from discord.ext import commands
 from uqcsbot.yelling import yelling_exemptor
 
 # X-SAMPA is basically a giant lookup table of symbols. It is split up into tables of
-# length 4, 3, 2, and 1 for ease of decoding. This is not the most efficient way to
-# convert X-SAMPA to Unicode, but it is definitely the simplest + easiest to understand.
+# length 4, 3, 2, and 1 for ease of reading. The tables are combined into a single regex
+# (see _Converter) which always matches the longest symbol, so converting is linear in
+# the length of the input.
 
 XSAMPA_LOOKUP_4 = {
     "G\\_<": "ʛ",
@@ -165,41 +169,75 @@ XSAMPA_LOOKUP_1 = {
 }
 
 
+class _Converter:
+    """
+    Converts text by replacing symbols from a lookup table, always replacing the longest
+    symbol that matches. Characters that are not part of any symbol are left as they are.
+    """
+
+    def __init__(self, lookup: Dict[str, str]):
+        self.lookup = lookup
+        # Alternatives are tried in order, so longer symbols must come first
+        self._pattern = re.compile(
+            "|".join(map(re.escape, sorted(lookup, key=len, reverse=True)))
+        )
+
+    def convert(self, text: str) -> str:
+        return self._pattern.sub(lambda match: self.lookup[match.group(0)], text)
+
+
+XSAMPA_TO_IPA = _Converter(
+    {**XSAMPA_LOOKUP_1, **XSAMPA_LOOKUP_2, **XSAMPA_LOOKUP_3, **XSAMPA_LOOKUP_4}
+)
+# Where several X-SAMPA symbols give the same IPA, the shortest (from the lowest table) is used
+IPA_TO_XSAMPA = _Converter(
+    {
+        glyph: symbol
+        for symbol, glyph in reversed(XSAMPA_TO_IPA.lookup.items())
+        if glyph != ""
+    }
+)
+
+
+def _code_span(text: str) -> str:
+    """
+    Returns the text as Discord markdown that shows it exactly, as X-SAMPA is full of
+    characters (such as \\, _, * and `) that markdown would otherwise hide or change.
+    """
+    if "`" not in text:
+        return f"`{text}`"
+    if "``" not in text:
+        # the spaces are not shown, and allow the text to start or end with a backtick
+        return f"`` {text} ``"
+    return f"```\n{text}\n```"
+
+
 class Phonetics(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
     @app_commands.command()
-    @app_commands.describe(input="X-SAMPA to convert")
+    @app_commands.describe(
+        input="X-SAMPA to convert",
+        reverse="Convert IPA to X-SAMPA instead (default False)",
+    )
     @yelling_exemptor(input_args=["input"])
-    async def xsampa(self, interaction: discord.Interaction, input: str):
+    async def xsampa(
+        self, interaction: discord.Interaction, input: str, reverse: bool = False
+    ):
         """
-        Converts X-SAMPA to IPA
+        Converts X-SAMPA to IPA (or IPA to X-SAMPA)
 
         For example: /xsampa j}kj}sI(j)EsbQt
 
             `j}kj}sI(j)EsbQt`
             jʉkjʉsɪ(j)ɛsbɒt
         """
-        remaining = input
-        output = ""
-        while len(remaining) > 0:
-            if glyph := XSAMPA_LOOKUP_4.get(remaining[0:4], None):
-                output += glyph
-                remaining = remaining[4:]
-            elif glyph := XSAMPA_LOOKUP_3.get(remaining[0:3], None):
-                output += glyph
-                remaining = remaining[3:]
-            elif glyph := XSAMPA_LOOKUP_2.get(remaining[0:2], None):
-                output += glyph
-                remaining = remaining[2:]
-            elif glyph := XSAMPA_LOOKUP_1.get(remaining[0:1], None):
-                output += glyph
-                remaining = remaining[1:]
-            else:
-                output += remaining[0]
-                remaining = remaining[1:]
-        await interaction.response.send_message(f"`{input}`\n{output}")
+        if reverse:
+            output = _code_span(IPA_TO_XSAMPA.convert(input))
+        else:
+            output = XSAMPA_TO_IPA.convert(input)
+        await interaction.response.send_message(f"{_code_span(input)}\n{output}")
 
 
 async def setup(bot: commands.Bot):
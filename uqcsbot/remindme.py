@@ -1,14 +1,22 @@
+import asyncio
+from collections import defaultdict
 import datetime as dt
 import discord
 from discord import app_commands
 from discord.ext import commands
-from functools import partial
 import logging
-from typing import List, NamedTuple, Optional, Union
+from typing import DefaultDict, Dict, List, NamedTuple, Optional, Set, Tuple, Union
 from zoneinfo import ZoneInfo
 
 from uqcsbot.bot import UQCSBot
 from uqcsbot.models import Reminders
+from uqcsbot.utils.reminder_utils import (
+    REMINDER_TIMEZONE,
+    MESSAGE_LENGTH_LIMIT,
+    ReminderDispatcher,
+    next_occurrence,
+    pack_messages,
+)
 
 USER_REMINDER_LIMIT = 10
 
@@ -19,6 +27,9 @@ REMINDME_REMOVED_TITLE = "RemindMe: Reminder Removed"
 REMINDME_LIST_TITLE = "RemindMe: List Reminders"
 
 REMINDER_MESSAGE = "Reminder set by <@{}>:\n> {}"
+CATCH_UP_MESSAGE = "While I was offline, {} reminder(s) set by <@{}> were missed:\n"
+# Seconds to wait between each message of missed reminders, so they don't flood channels
+CATCH_UP_MESSAGE_INTERVAL = 2
 REMINDER_NOT_FOUND_ERR = "Reminder id not found."
 REMINDER_LIMIT_REACHED_ERR = (
     f"You've reached the maximum number of active reminders ({USER_REMINDER_LIMIT})."
@@ -35,6 +46,7 @@ LIST_REMINDERS_FOOTER = "You can view your active reminders with /remindme list.
 DISPLAY_DATE_FORMAT = "%A %d %b %Y"
 DISPLAY_DAY_NAME_FORMAT = "%A"
 DISPLAY_TIME_FORMAT = "%-I:%M %p"
+DISPLAY_DATETIME_FORMAT = "%a %d %b %-I:%M %p"
 
 
 class Reminder(NamedTuple):
@@ -77,6 +89,21 @@ class Reminder(NamedTuple):
             f"ending {end_date}{frequency}:\n> {message}"
         )
 
+    @classmethod
+    def from_db(cls, reminder: Reminders) -> "Reminder":
+        """Creates a Reminder from a row of the Reminders table"""
+        return cls(
+            reminder.id,
+            reminder.user_id,
+            reminder.channel_id,
+            reminder.time_created,
+            reminder.message,
+            reminder.time,
+            reminder.start_date,
+            reminder.end_date,
+            reminder.week_frequency,
+        )
+
     def removed_str(self):
         return f"Reminder with id {self.id} removed:\n> {self.message}"
 
@@ -131,95 +158,144 @@ class RemindMe(commands.Cog):
 
     def __init__(self, bot: UQCSBot):
         self.bot = bot
+        # All reminders are sent by a single dispatcher, keyed by reminder id
+        self.dispatcher: ReminderDispatcher[int] = ReminderDispatcher(
+            self._dispatch_reminders
+        )
+        self.scheduled_reminders: Dict[int, Reminder] = {}
+        # Ids of reminders that are being sent (including missed reminders whose digests
+        # are being sent). Removing a reminder while it is being sent removes its id, so
+        # that it isn't scheduled again once it has been sent.
+        self.sending_reminders: Set[int] = set()
+
+    async def cog_unload(self):
+        self.dispatcher.stop()
 
     @commands.Cog.listener()
     async def on_ready(self):
-        """Schedule all pre-existing reminders once bot is ready"""
+        """
+        Schedule all pre-existing reminders once bot is ready, and send a digest of any
+        reminders that were missed while the bot was down.
+
+        Only the latest due occurrence of each reminder is caught up on. Recurring
+        reminders that are still active are simply scheduled for their next occurrence,
+        so their occurrences during the downtime are not sent, as the database doesn't
+        record which occurrences were already sent before the bot went down.
+        """
+        now = dt.datetime.now(tz=REMINDER_TIMEZONE)
+        missed: List[Tuple[Reminder, dt.datetime]] = []
         for reminder in self._get_all_reminders():
-            self._schedule_reminder(reminder)
+            if (
+                reminder.id in self.scheduled_reminders
+                or reminder.id in self.sending_reminders
+            ):
+                continue  # already scheduled or being sent before a reconnect
+            next_datetime = self._next_reminder_datetime(reminder)
+            if next_datetime != None and next_datetime < now:
+                missed.append((reminder, next_datetime))
+            else:
+                self._schedule_reminder(reminder)
+        self.dispatcher.start()
         logging.info(f"All pre-existing reminders scheduled")
 
-    def _add_reminder_to_db(self, reminder: Reminder):
-        """Adds the given Reminder to the Reminders table in the database"""
+        if missed:
+            # Marked before awaiting, so a reconnect during the digests doesn't resend them
+            missed_ids = {reminder.id for reminder, _ in missed}
+            self.sending_reminders |= missed_ids
+            try:
+                await self._catch_up_reminders(missed)
+            finally:
+                self.sending_reminders -= missed_ids
+
+    def _add_reminder_to_db(self, reminder: Reminder) -> Reminder:
+        """
+        Adds the given Reminder to the Reminders table in the database. The id of the given
+        Reminder is ignored, and the Reminder is returned with the id the database allocated.
+        """
         db_session = self.bot.create_db_session()
-        db_session.add(
-            Reminders(
-                id=reminder.id,
-                user_id=reminder.user_id,
-                channel_id=reminder.channel_id,
-                time_created=reminder.time_created,
-                message=reminder.message,
-                time=reminder.time,
-                start_date=reminder.start_date,
-                end_date=reminder.end_date,
-                week_frequency=reminder.week_frequency,
-            )
+        reminder_row = Reminders(
+            user_id=reminder.user_id,
+            channel_id=reminder.channel_id,
+            time_created=reminder.time_created,
+            message=reminder.message,
+            time=reminder.time,
+            start_date=reminder.start_date,
+            end_date=reminder.end_date,
+            week_frequency=reminder.week_frequency,
         )
+        db_session.add(reminder_row)
         db_session.commit()
+        added_reminder = reminder._replace(id=reminder_row.id)
         db_session.close()
 
+        return added_reminder
+
     def _remove_reminder_from_db(self, reminder_id: int) -> Reminder:
         """Removes the reminder with id `reminder_id` from the Reminders table in the database"""
         db_session = self.bot.create_db_session()
         reminder_query = (
             db_session.query(Reminders).filter(Reminders.id == reminder_id).one()
         )
-        removed_reminder = Reminder(
-            reminder_query.id,
-            reminder_query.user_id,
-            reminder_query.channel_id,
-            reminder_query.time_created,
-            reminder_query.message,
-            reminder_query.time,
-            reminder_query.start_date,
-            reminder_query.end_date,
-            reminder_query.week_frequency,
-        )
+        removed_reminder = Reminder.from_db(reminder_query)
         db_session.delete(reminder_query)
         db_session.commit()
         db_session.close()
 
         return removed_reminder
 
+    def _remove_reminders_from_db(self, reminder_ids: List[int]):
+        """Removes all the reminders with the given ids from the Reminders table in the database"""
+        if not reminder_ids:
+            return
+        db_session = self.bot.create_db_session()
+        db_session.query(Reminders).filter(Reminders.id.in_(reminder_ids)).delete(
+            synchronize_session=False
+        )
+        db_session.commit()
+        db_session.close()
+
     def _get_all_reminders(self) -> List[Reminder]:
         """Returns all the active reminders in the database in creation order"""
         db_session = self.bot.create_db_session()
-        reminders_query = db_session.query(Reminders)
+        reminders_query = (
+            db_session.query(Reminders).order_by(Reminders.time_created).all()
+        )
         db_session.close()
 
-        return [
-            Reminder(
-                reminder.id,
-                reminder.user_id,
-                reminder.channel_id,
-                reminder.time_created,
-                reminder.message,
-                reminder.time,
-                reminder.start_date,
-                reminder.end_date,
-                reminder.week_frequency,
-            )
-            for reminder in sorted(
-                reminders_query, key=lambda reminder: reminder.time_created
-            )
-        ]
+        return [Reminder.from_db(reminder) for reminder in reminders_query]
 
     def _get_user_reminders(self, user_id: int) -> List[Reminder]:
         """Returns all the active reminders belonging to the user with id `user_id` in creation order"""
-        return list(
-            filter(
-                lambda reminder: reminder.user_id == user_id, self._get_all_reminders()
-            )
+        db_session = self.bot.create_db_session()
+        reminders_query = (
+            db_session.query(Reminders)
+            .filter(Reminders.user_id == user_id)
+            .order_by(Reminders.time_created)
+            .all()
         )
+        db_session.close()
 
-    def _get_unused_reminder_id(self) -> int:
-        """Returns a reminder id that is not currently in use"""
-        reminders = self._get_all_reminders()
-        reminder_ids = [reminder.id for reminder in reminders]
-        i = 1
-        while (id := i) in reminder_ids:
-            i += 1
-        return id
+        return [Reminder.from_db(reminder) for reminder in reminders_query]
+
+    def _count_user_reminders(self, user_id: int) -> int:
+        """Returns the number of active reminders belonging to the user with id `user_id`"""
+        db_session = self.bot.create_db_session()
+        count = db_session.query(Reminders).filter(Reminders.user_id == user_id).count()
+        db_session.close()
+
+        return count
+
+    def _user_has_reminder(self, user_id: int, reminder_id: int) -> bool:
+        """Returns whether the user with id `user_id` has an active reminder with id `reminder_id`"""
+        db_session = self.bot.create_db_session()
+        reminder = (
+            db_session.query(Reminders)
+            .filter(Reminders.id == reminder_id, Reminders.user_id == user_id)
+            .one_or_none()
+        )
+        db_session.close()
+
+        return reminder != None
 
     def _reached_reminder_limit(
         self, user: Union[discord.User, discord.Member]
@@ -234,128 +310,261 @@ class RemindMe(commands.Cog):
             # manage_event perms: for committee use.
             if member.guild_permissions.manage_events:
                 return False
-            return len(self._get_user_reminders(user.id)) >= USER_REMINDER_LIMIT
+            return self._count_user_reminders(user.id) >= USER_REMINDER_LIMIT
         return True
 
-    def _schedule_reminder(self, reminder: Reminder):
-        """Schedules the reminder to be sent at its specified time (or its next recurring time)"""
-        today = dt.date.today()
+    def _next_reminder_datetime(self, reminder: Reminder) -> Optional[dt.datetime]:
+        """
+        Returns when the reminder should next be sent, or None if it has ended. Reminders
+        that were missed (bot downtime or something went wrong etc.) are due now.
+        """
+        now = dt.datetime.now(tz=REMINDER_TIMEZONE)
         time = reminder.time
-        start_date = reminder.start_date
-        start_datetime = dt.datetime.combine(reminder.start_date, time)
+        start_datetime = dt.datetime.combine(
+            reminder.start_date, time, tzinfo=REMINDER_TIMEZONE
+        )
         end_datetime = (
-            dt.datetime.combine(reminder.end_date, time)
+            dt.datetime.combine(reminder.end_date, time, tzinfo=REMINDER_TIMEZONE)
             if reminder.end_date != None
             else None
         )
 
-        # if reminder datetime is in the past (bot downtime or something went wrong etc.), send a reminder now
-        if (
-            (reminder.week_frequency == None and start_datetime < dt.datetime.now())
-            or reminder.week_frequency != None
-            and end_datetime != None
-            and end_datetime < dt.datetime.now()
+        # one-time reminder OR first occurrence of recurring reminder, so schedule for start_date
+        if reminder.week_frequency == None or start_datetime > now:
+            return start_datetime
+
+        # if a recurring reminder has ended while the bot was down, its last occurrence is due
+        if end_datetime != None and end_datetime < now:
+            return end_datetime
+
+        # non-first occurrence of recurring reminder, schedule next occurrence based on week_frequency.
+        # returns None if the next occurrence is past end_date, as this reminder is done
+        return next_occurrence(
+            reminder.start_date,
+            time,
+            reminder.week_frequency,
+            reminder.end_date,
+            now,
+        )
+
+    def _schedule_reminder(self, reminder: Reminder):
+        """Schedules the reminder to be sent at its specified time (or its next recurring time)"""
+        if (next_datetime := self._next_reminder_datetime(reminder)) is None:
+            self._unschedule_reminder(reminder.id)
+            self._remove_reminder_from_db(reminder.id)
+            return
+        self.scheduled_reminders[reminder.id] = reminder
+        self.dispatcher.schedule(reminder.id, next_datetime)
+
+    def _unschedule_reminder(self, reminder_id: int):
+        """Stops the reminder with id `reminder_id` from being sent in the future"""
+        self.dispatcher.cancel(reminder_id)
+        self.scheduled_reminders.pop(reminder_id, None)
+        self.sending_reminders.discard(reminder_id)
+
+    def _reminder_destination(
+        self, reminder: Reminder
+    ) -> Optional[Tuple[discord.Member, Union[discord.TextChannel, discord.Member]]]:
+        """
+        Returns the member who set the reminder and where it should be sent, or None
+        (after logging why) if it can't be sent.
+        """
+        if (member := self.bot.uqcs_server.get_member(reminder.user_id)) == None:
+            logging.warning(f"User with id {reminder.user_id} couldn't be found")
+            return None
+        if reminder.channel_id == None:  # send in DMs
+            return member, member
+        if isinstance(
+            channel := self.bot.get_channel(reminder.channel_id), discord.TextChannel
         ):
-            self.bot.schedule_task(
-                partial(self._process_reminder, reminder), misfire_grace_time=None
-            )
+            # send in server channel, if it is a text channel
+            return member, channel
+        logging.warning(
+            f"Reminder couldn't be sent to channel with id {reminder.channel_id}; not a text channel"
+        )
+        return None
 
-        # otherwise, reminder datetime is in the future so we can schedule it
-        if reminder.week_frequency == None or start_datetime > dt.datetime.now():
-            # one-time reminder OR first occurrence of recurring reminder, so schedule for start_date
-            return self.bot.schedule_task(
-                partial(self._process_reminder, reminder),
-                trigger="cron",
-                timezone="Australia/Brisbane",
-                misfire_grace_time=None,
-                year=start_date.year,
-                month=start_date.month,
-                day=start_date.day,
-                hour=time.hour,
-                minute=time.minute,
-                second=time.second,
+    async def _dispatch_reminders(self, due: List[Tuple[int, dt.datetime]]):
+        """
+        Sends all the reminders that the dispatcher has found to be due, combining
+        reminders set by the same user for the same destination into as few messages as
+        possible. Then schedules any future reminders if they are recurring and haven't
+        ended yet, and removes the rest from the database.
+        """
+        reminders = [
+            (reminder, scheduled_time)
+            for reminder_id, scheduled_time in due
+            if (reminder := self.scheduled_reminders.pop(reminder_id, None)) != None
+        ]
+        if not reminders or self.bot.uqcs_server == None:
+            return
+        # Marked before awaiting, so a reconnect while sending doesn't schedule them again
+        reminder_ids = {reminder.id for reminder, _ in reminders}
+        self.sending_reminders |= reminder_ids
+        try:
+            await self._send_reminder_groups(reminders)
+        finally:
+            # finished even if some couldn't be sent, so recurring ones aren't lost
+            self._finish_reminders([reminder for reminder, _ in reminders])
+            self.sending_reminders -= reminder_ids
+
+    async def _send_reminder_groups(
+        self, reminders: List[Tuple[Reminder, dt.datetime]]
+    ):
+        """
+        Sends the given reminders (with their scheduled times), grouped by member and
+        destination. A group that fails to send doesn't stop the others being sent.
+        """
+        # reminders are only combined with others set by the same user, so that a
+        # combined message can only mention what each of its reminders could alone
+        groups: DefaultDict[Tuple[int, int], List[Tuple[Reminder, dt.datetime]]] = (
+            defaultdict(list)
+        )
+        destinations: Dict[
+            Tuple[int, int],
+            Tuple[discord.Member, Union[discord.TextChannel, discord.Member]],
+        ] = {}
+        for reminder, scheduled_time in reminders:
+            if (destination := self._reminder_destination(reminder)) == None:
+                continue
+            member, ctx = destination
+            destinations[(ctx.id, member.id)] = destination
+            groups[(ctx.id, member.id)].append((reminder, scheduled_time))
+
+        results = await asyncio.gather(
+            *(
+                self._send_reminder_group(*destinations[key], group)
+                for key, group in groups.items()
+            ),
+            return_exceptions=True,
+        )
+        latencies: List[float] = []
+        for key, result in zip(groups, results):
+            if isinstance(result, BaseException):
+                logging.error(
+                    f"Reminders couldn't be sent to {destinations[key][1]}",
+                    exc_info=result,
+                )
+            else:
+                latencies.extend(result)
+        if latencies:
+            logging.info(
+                f"Sent {len(latencies)} reminder(s) to {len(groups)} destination(s); "
+                f"latency mean {sum(latencies) / len(latencies):.2f}s, max {max(latencies):.2f}s"
             )
 
-        # non-first occurrence of recurring reminder, schedule next occurrence based on week_frequency
-        if reminder.week_frequency == 0:
-            # daily reminder, schedule for today or tomorrow depending on time
-            if time > dt.datetime.now().time():
-                year, month, day = today.year, today.month, today.day
-            else:
-                tomorrow = today + dt.timedelta(days=1)
-                year, month, day = tomorrow.year, tomorrow.month, tomorrow.day
+    async def _send_reminder_group(
+        self,
+        member: discord.Member,
+        ctx: Union[discord.TextChannel, discord.Member],
+        group: List[Tuple[Reminder, dt.datetime]],
+    ) -> List[float]:
+        """
+        Sends a group of reminders set by the member to the same destination, combined
+        into as few messages as fit within Discord's message length limit. Returns the
+        number of seconds each sent reminder was delivered after its scheduled time.
+        """
+        if member.guild_permissions.mention_everyone:
+            allowed_mentions = discord.AllowedMentions.all()
         else:
-            # schedule for next available datetime
-            next_date = start_date
-            if time <= dt.datetime.now().time():
-                # find next available datetime after today
-                while next_date <= today:
-                    next_date += dt.timedelta(days=7 * reminder.week_frequency)
-            else:
-                # find next available datetime after yesterday
-                while next_date < today:
-                    next_date += dt.timedelta(days=7 * reminder.week_frequency)
-            year, month, day = next_date.year, next_date.month, next_date.day
-
-        # check selected datetime is not past end_date; if so, this reminder is done
-        datetime = dt.datetime.combine(dt.date(year, month, day), time)
-        if end_datetime != None and datetime > end_datetime:
-            return self._remove_reminder_from_db(reminder.id)
-
-        self.bot.schedule_task(
-            partial(self._process_reminder, reminder),
-            trigger="cron",
-            timezone="Australia/Brisbane",
-            misfire_grace_time=None,
-            year=year,
-            month=month,
-            day=day,
-            hour=time.hour,
-            minute=time.minute,
-            second=time.second,
-        )
+            allowed_mentions = discord.AllowedMentions(users=[member])
+
+        texts = [
+            REMINDER_MESSAGE.format(reminder.user_id, reminder.message)
+            for reminder, _ in group
+        ]
+        try:
+            for content in pack_messages(texts):
+                await ctx.send(content, allowed_mentions=allowed_mentions)
+        except discord.HTTPException as error:
+            logging.warning(f"Reminders couldn't be sent to {ctx}: {error}")
+            return []
+
+        now = dt.datetime.now(tz=REMINDER_TIMEZONE)
+        return [(now - scheduled_time).total_seconds() for _, scheduled_time in group]
 
-    async def _process_reminder(self, reminder: Reminder):
+    async def _catch_up_reminders(self, missed: List[Tuple[Reminder, dt.datetime]]):
         """
-        Sends the given reminder, and schedules any future reminders if it is recurring and hasn't
-        ended yet. Otherwise, removes the reminder from the database.
+        Sends reminders that were missed while the bot was down. Rather than sending each
+        one, the missed reminders of each user are combined into a digest for each
+        destination, and digests are sent slowly so they don't flood channels.
         """
-        if self.bot.uqcs_server != None:
-            if (member := self.bot.uqcs_server.get_member(reminder.user_id)) != None:
-                ctx = None
-                if reminder.channel_id == None:  # send in DMs
-                    ctx = member
-                elif isinstance(
-                    channel := self.bot.get_channel(reminder.channel_id),
-                    discord.TextChannel,
-                ):
-                    # send in server channel, if it is a text channel
-                    ctx = channel
-
-                if ctx != None:
-                    if member.guild_permissions.mention_everyone:
-                        allowed_mentions = discord.AllowedMentions.all()
-                    else:
-                        allowed_mentions = discord.AllowedMentions(users=[member])
-                    await ctx.send(
-                        REMINDER_MESSAGE.format(reminder.user_id, reminder.message),
-                        allowed_mentions=allowed_mentions,
-                    )
-                else:
+        if self.bot.uqcs_server == None:
+            return
+        try:
+            await self._send_catch_up_digests(missed)
+        finally:
+            self._finish_reminders([reminder for reminder, _ in missed])
+
+    async def _send_catch_up_digests(self, missed: List[Tuple[Reminder, dt.datetime]]):
+        """
+        Sends a digest of the given missed reminders (with their scheduled times) to each
+        destination, waiting between messages.
+        """
+        groups: DefaultDict[Tuple[int, int], List[Tuple[Reminder, dt.datetime]]] = (
+            defaultdict(list)
+        )
+        destinations: Dict[
+            Tuple[int, int],
+            Tuple[discord.Member, Union[discord.TextChannel, discord.Member]],
+        ] = {}
+        for reminder, scheduled_time in missed:
+            if (destination := self._reminder_destination(reminder)) == None:
+                continue
+            member, ctx = destination
+            destinations[(ctx.id, member.id)] = destination
+            groups[(ctx.id, member.id)].append((reminder, scheduled_time))
+
+        sent_messages = 0
+        for key, group in groups.items():
+            member, ctx = destinations[key]
+            if member.guild_permissions.mention_everyone:
+                allowed_mentions = discord.AllowedMentions.all()
+            else:
+                allowed_mentions = discord.AllowedMentions(users=[member])
+
+            header = CATCH_UP_MESSAGE.format(len(group), member.id)
+            lines = [
+                f"> {reminder.message} (due {scheduled_time.strftime(DISPLAY_DATETIME_FORMAT)})"
+                for reminder, scheduled_time in sorted(group, key=lambda x: x[1])
+            ]
+            for content in pack_messages(
+                lines, limit=MESSAGE_LENGTH_LIMIT - len(header), separator="\n"
+            ):
+                if sent_messages > 0:
+                    await asyncio.sleep(CATCH_UP_MESSAGE_INTERVAL)
+                try:
+                    await ctx.send(header + content, allowed_mentions=allowed_mentions)
+                    sent_messages += 1
+                except discord.HTTPException as error:
                     logging.warning(
-                        f"Reminder couldn't be sent to channel with id {reminder.channel_id}; not a text channel"
+                        f"Missed reminders couldn't be sent to {ctx}: {error}"
                     )
-            else:
-                logging.warning(f"User with id {reminder.user_id} couldn't be found")
+                    break
+
+        logging.info(
+            f"Caught up on {len(missed)} missed reminder(s) with {sent_messages} digest message(s)"
+        )
 
+    def _finish_reminders(self, reminders: List[Reminder]):
+        """
+        Schedules the next occurrence of sent recurring reminders that haven't ended yet,
+        and removes all other sent reminders from the database at once. Reminders that
+        were removed while they were being sent are skipped.
+        """
+        today = dt.datetime.now(tz=REMINDER_TIMEZONE).date()
+        finished_ids: List[int] = []
+        for reminder in reminders:
+            if reminder.id not in self.sending_reminders:
+                continue  # removed while being sent
             if reminder.week_frequency == None:  # one-time reminder, remove from db
-                self._remove_reminder_from_db(reminder.id)
-            else:  # recurring reminder
-                # check if we need to schedule reminder again
-                if reminder.end_date == None or reminder.end_date > dt.date.today():
-                    self._schedule_reminder(reminder)
-                else:
-                    self._remove_reminder_from_db(reminder.id)
+                finished_ids.append(reminder.id)
+            elif reminder.end_date == None or reminder.end_date > today:
+                # recurring reminder that needs to be scheduled again
+                self._schedule_reminder(reminder)
+            else:
+                finished_ids.append(reminder.id)
+        self._remove_reminders_from_db(finished_ids)
 
     @remindme_group.command(name="add")
     @app_commands.describe(
@@ -396,7 +605,7 @@ class RemindMe(commands.Cog):
 
         # add reminder to db and schedule
         reminder = Reminder(
-            self._get_unused_reminder_id(),
+            0,  # allocated by the database
             interaction.user.id,
             interaction.channel_id,
             dt.datetime.now(),
@@ -406,7 +615,7 @@ class RemindMe(commands.Cog):
             check_date,
             None,
         )
-        self._add_reminder_to_db(reminder)
+        reminder = self._add_reminder_to_db(reminder)
         self._schedule_reminder(reminder)
 
         embed = _add_reminder_embed(reminder, LIST_REMINDERS_FOOTER)
@@ -462,7 +671,7 @@ class RemindMe(commands.Cog):
 
         # add reminder to db and schedule
         reminder = Reminder(
-            self._get_unused_reminder_id(),
+            0,  # allocated by the database
             interaction.user.id,
             interaction.channel_id,
             dt.datetime.now(),
@@ -472,7 +681,7 @@ class RemindMe(commands.Cog):
             check_end_date,
             week_frequency,
         )
-        self._add_reminder_to_db(reminder)
+        reminder = self._add_reminder_to_db(reminder)
         self._schedule_reminder(reminder)
 
         embed = _add_reminder_embed(reminder, LIST_REMINDERS_FOOTER)
@@ -482,13 +691,11 @@ class RemindMe(commands.Cog):
     @app_commands.describe(reminder_id="Reminder id")
     async def remove_reminder(self, interaction: discord.Interaction, reminder_id: int):
         """Removes an active reminder"""
-        reminders = self._get_user_reminders(interaction.user.id)
-        reminder_ids = [reminder.id for reminder in reminders]
-
-        if reminder_id not in reminder_ids:
+        if not self._user_has_reminder(interaction.user.id, reminder_id):
             embed = _error_embed(REMINDER_NOT_FOUND_ERR, LIST_REMINDERS_FOOTER)
             return await interaction.response.send_message(embed=embed)
 
+        self._unschedule_reminder(reminder_id)
         removed_reminder = self._remove_reminder_from_db(reminder_id)
         embed = _remove_reminder_embed(removed_reminder)
         await interaction.response.send_message(embed=embed)
@@ -1,4 +1,4 @@
-from random import choice, randrange
+from random import choice, choices, randrange
 from string import hexdigits
 from typing import Optional, List
 
@@ -6,8 +6,15 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from uqcsbot.utils.text_utils import (
+    bytes_to_bits,
+    caesar_table,
+    send_split_message,
+)
 from uqcsbot.yelling import yelling_exemptor
 
+ROT_13_TABLE = caesar_table(13)
+
 
 async def encoding_autocomplete(
     interaction: discord.Interaction, current: str
@@ -103,10 +110,7 @@ class Text(commands.Cog):
             if len(message) % 8 != 0:
                 response = "Binary string contains partial byte."
             else:
-                decoded_message = bytearray()
-                for i in range(0, len(message), 8):
-                    n = int(message[i : i + 8], 2)
-                    decoded_message.append(n)
+                decoded_message = int(message, 2).to_bytes(len(message) // 8, "big")
                 try:
                     response = decoded_message.decode(encoding)
                 except UnicodeDecodeError as e:
@@ -116,13 +120,13 @@ class Text(commands.Cog):
         else:
             try:
                 encoded_message = message.encode(encoding)
-                response = "".join([f"{byte:08b}" for byte in encoded_message])
+                response = bytes_to_bits(encoded_message)
             except UnicodeEncodeError as e:
                 response = e.reason
             except LookupError:
                 response = "Invalid encoding. A list of valid encodings can be found at <https://docs.python.org/3/library/codecs.html#standard-encodings>"
 
-        await interaction.response.send_message(response)
+        await send_split_message(interaction, response)
 
     @app_commands.command()
     @app_commands.describe(
@@ -140,17 +144,7 @@ class Text(commands.Cog):
         N defaults to 13 if not given.
         """
         distance = distance if distance is not None else 13
-        result = ""
-
-        for c in message:
-            if ord("A") <= ord(c) <= ord("Z"):
-                result += chr((ord(c) - ord("A") + distance) % 26 + ord("A"))
-            elif ord("a") <= ord(c) <= ord("z"):
-                result += chr((ord(c) - ord("a") + distance) % 26 + ord("a"))
-            else:
-                result += c
-
-        await interaction.response.send_message(result)
+        await send_split_message(interaction, message.translate(caesar_table(distance)))
 
     @app_commands.command()
     @app_commands.describe(
@@ -190,7 +184,7 @@ class Text(commands.Cog):
             except LookupError:
                 response = "Invalid encoding. A list of valid encodings can be found at <https://docs.python.org/3/library/codecs.html#standard-encodings>"
 
-        await interaction.response.send_message(response)
+        await send_split_message(interaction, response)
 
     @app_commands.command()
     @app_commands.describe(code="HTTP code")
@@ -262,19 +256,17 @@ class Text(commands.Cog):
 
     def zalgo_common(self, message: str) -> str:
         """Zalgo-ifies a given string."""
-        response = ""
-        for c in " ".join(message):
-            response += c
-            for _ in range(randrange(7) // 3):
-                response += choice(self.zalgo_marks)
-        return response
+        return "".join(
+            c + "".join(choices(self.zalgo_marks, k=randrange(7) // 3))
+            for c in " ".join(message)
+        )
 
     async def zalgo_context(
         self, interaction: discord.Interaction, message: discord.Message
     ):
         "á ̵d ̵d s̨  ̨͟ z ̛a l g o  ̸ e͝ ͘f f̵͠ e͢ c̷ ̸t  ́ ̡͟t o ̶ ̀ t̶͞ h́ ̡i͢ s  m ́͟e̶ ̢s s̢ a͝ ̨g e͞"
 
-        await interaction.response.send_message(self.zalgo_common(message.content))
+        await send_split_message(interaction, self.zalgo_common(message.content))
 
     @app_commands.command(name="zalgo")
     @app_commands.describe(text="Input text")
@@ -284,18 +276,10 @@ class Text(commands.Cog):
         Ȃd͍̋͗̃d͒̈́s̒͢ ̅̂̚͏̞̩ͅZͩ̆a̦̐ͭ́l̠̫̈́̐g̡͗ͯo̝̱̽ ̮̰͊c̢̞ͬh̩ͤ̑a̡̫̟͐̽̌r̪̭͇̓a̘͕̣c͓̐́t̠̂̈̓e̳̣̣͂̉r͓͗s͉̞͝ t̙͓̊ͨoͭ ̋̽͊t̛̖̮̊͋hͤ̂͏̯̺͚e̷͖̩̙̿ ͇̩̕ğ̵̟̘̼i̢͙̜v̲ͫ͘e͐͐͆̕n͟ ̭͋͢ͅt͐͆̀e̝̱͑͛x̝̲t͇͕
         """
 
-        await interaction.response.send_message(self.zalgo_common(text))
+        await send_split_message(interaction, self.zalgo_common(text))
 
     def rot_13_cipher(self, text: str) -> str:
-        result = ""
-        for c in text:
-            if "a" <= c <= "m" or "A" <= c <= "M":
-                result += chr(ord(c) + 13)
-            elif "n" <= c <= "z" or "N" <= c <= "Z":
-                result += chr(ord(c) - 13)
-            else:
-                result += c
-        return result
+        return text.translate(ROT_13_TABLE)
 
     @app_commands.command(name="rot_13")
     @app_commands.describe(text="Input text")
@@ -304,7 +288,7 @@ class Text(commands.Cog):
         """
         Encodes the given text with the cunning ROT13 Cipher
         """
-        await interaction.response.send_message(self.rot_13_cipher(text))
+        await send_split_message(interaction, self.rot_13_cipher(text))
 
     ##    async def rot_13_context(
     ##        self, interaction: discord.Interaction, message: discord.Message
@@ -320,8 +304,8 @@ class Text(commands.Cog):
         """
         Encodes this message with the cunning ROT13 Cipher, and shows it secretly to the caller
         """
-        await interaction.response.send_message(
-            self.rot_13_cipher(message.content), ephemeral=True
+        await send_split_message(
+            interaction, self.rot_13_cipher(message.content), ephemeral=True
         )
 
 
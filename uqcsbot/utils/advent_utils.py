@@ -1,24 +1,34 @@
 from typing import (
     Any,
-    DefaultDict,
     Iterable,
+    Iterator,
     List,
     Literal,
     Dict,
     Optional,
     Callable,
     Tuple,
-    cast,
+    TypeVar,
 )
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import OrderedDict
 from collections.abc import Hashable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from functools import lru_cache
 from io import BytesIO
+import asyncio
+import hashlib
+import heapq
+import logging
+import math
+import os
+import random
+import re
+import threading
 
 import PIL.Image
+import PIL.ImageChops
 import PIL.ImageDraw
 import PIL.ImageFont
 
@@ -47,6 +57,8 @@ class ColourFragment(Hashable):
 
 Leaderboard = list[str | ColourFragment]
 
+T = TypeVar("T")
+
 # Puzzles are unlocked at midnight EST.
 EST_TIMEZONE = ZoneInfo("America/New_York")
 
@@ -62,6 +74,35 @@ GOLD_COLOUR = "#ffff66"
 SILVER_COLOUR = "#9999cc"
 
 
+# Leaderboard images are rendered within a small pool of worker threads, to avoid
+# blocking the event loop. Each worker loads its own copy of the font.
+LEADERBOARD_FONT_PATH = "uqcsbot/static/NotoSansMono-Regular.ttf"
+RENDER_WORKERS = 2
+_render_executor = ThreadPoolExecutor(
+    max_workers=RENDER_WORKERS, thread_name_prefix="leaderboard-render"
+)
+_worker_state = threading.local()
+
+# Rendered leaderboard images, keyed by a hash of the leaderboard content. These are
+# shared between all leaderboard views. If AOC_IMAGE_CACHE_DIR is set, images are
+# also stored on disk so that they survive restarts, keeping only the most recently
+# used IMAGE_DISK_CACHE_SIZE images.
+IMAGE_CACHE_SIZE = 64
+IMAGE_CACHE_DIR = os.environ.get("AOC_IMAGE_CACHE_DIR") or None
+IMAGE_DISK_CACHE_SIZE = 512
+_image_cache: OrderedDict[str, bytes] = OrderedDict()
+
+# Rendered leaderboard rows, keyed by a hash of the row content. During December the
+# same leaderboards are rendered repeatedly with only a few changed rows, so most rows
+# can be reused. This is shared between render workers, so must be locked.
+ROW_CACHE_SIZE = 2048
+_row_cache: OrderedDict[str, PIL.Image.Image] = OrderedDict()
+_row_cache_lock = threading.Lock()
+
+# Used to blank out text while preserving line breaks, so layers stay aligned.
+_NON_WHITESPACE = re.compile(r"\S")
+
+
 class InvalidHTTPSCode(Exception):
     def __init__(self, message: str, request_code: int):
         super().__init__(message)
@@ -178,6 +219,29 @@ class Member:
         return None
 
 
+def weighted_sample_without_replacement(
+    population: List[T], weights: List[int], k: int, rng: random.Random
+) -> List[T]:
+    """
+    Selects k distinct items from the population, where the weight of an item is like
+    how many tickets it has in a lottery. Items with a weight of 0 are never chosen.
+    Returns an empty list if there are fewer than k items that can be chosen.
+
+    This uses the method of Efraimidis and Spirakis: each item is given a random key
+    of u^(1/weight) and the k largest keys are chosen, which takes O(n log k) time.
+    Logarithms of the keys are compared, to avoid underflow with large weights.
+    The inputs are not modified, and the result only depends on the state of rng.
+    """
+    keyed = [
+        (math.log(1.0 - rng.random()) / weight, index)
+        for index, weight in enumerate(weights)
+        if weight > 0
+    ]
+    if len(keyed) < k:
+        return []
+    return [population[index] for _, index in heapq.nlargest(k, keyed)]
+
+
 def _star_char(num_stars: int):
     """
     Given a number of stars (0, 1, or 2), returns its leaderboard
@@ -435,69 +499,284 @@ def _isolate_leaderboard_layers(
       for calculating bounding box size.
     - a dictionary mapping colours to the layer of that colour.
     """
-    layers: DefaultDict[str | None, str] = defaultdict(lambda: layers[None])
-    layers[None] = ""
+    # Each layer starts as a copy of the blanked leaderboard, with the text of
+    # that colour written over the top. Buffers are lists of fragments that
+    # are only joined once at the end, so the cost is linear in the output.
+    blanked: List[str] = []
+    positions: Dict[Colour, List[Tuple[int, str]]] = {}
 
     for frag in leaderboard:
         colour, text = (
             (FG_COLOUR, frag) if isinstance(frag, str) else (frag.colour, frag.text)
         )
-        layers[colour] += text
-        for k in layers:
-            if k == colour:
-                continue
-            layers[k] += "".join(c if c.isspace() else " " for c in text)
+        positions.setdefault(colour, []).append((len(blanked), text))
+        blanked.append(_NON_WHITESPACE.sub(" ", text))
 
-    spaces_str = layers.pop(None)
-    return spaces_str, cast(Dict[str, Any], layers)
+    layers: Dict[Colour, str] = {}
+    for colour, fragments in positions.items():
+        buffer = blanked.copy()
+        for index, text in fragments:
+            buffer[index] = text
+        layers[colour] = "".join(buffer)
 
+    return "".join(blanked), layers
 
-@lru_cache(maxsize=16)
-def render_leaderboard_to_image(leaderboard: Tuple[str | ColourFragment, ...]) -> bytes:
-    spaces, layers = _isolate_leaderboard_layers(leaderboard)
 
-    # NOTE: font choice should support as wide a range of glyphs as possible,
-    # since discord display names are arbitrary and pillow does not support
-    # fallback fonts.
-    # font must also be monospace, in order for the colour layers to be aligned.
-    font = PIL.ImageFont.truetype("./uqcsbot/static/NotoSansMono-Regular.ttf", 20)
+def _get_font() -> PIL.ImageFont.FreeTypeFont:
+    """
+    Returns the leaderboard font, loading it at most once per render worker.
+    """
+    font: Optional[PIL.ImageFont.FreeTypeFont] = getattr(_worker_state, "font", None)
+    if font is None:
+        # NOTE: font choice should support as wide a range of glyphs as possible,
+        # since discord display names are arbitrary and pillow does not support
+        # fallback fonts.
+        # font must also be monospace, in order for the colour layers to be aligned.
+        font = PIL.ImageFont.truetype(LEADERBOARD_FONT_PATH, 20)
+        _worker_state.font = font
+    return font
+
+
+def leaderboard_hash(leaderboard: Iterable[str | ColourFragment]) -> str:
+    """
+    Returns a hash of the content of a leaderboard, used to key the image cache.
+    """
+    digest = hashlib.sha256()
+    for frag in leaderboard:
+        colour, text = (
+            (FG_COLOUR, frag) if isinstance(frag, str) else (frag.colour, frag.text)
+        )
+        # Length prefixes keep the encoding unambiguous
+        encoded = text.encode("utf-8")
+        digest.update(f"{colour}:{len(encoded)}:".encode("utf-8"))
+        digest.update(encoded)
+    return digest.hexdigest()
 
-    img = PIL.Image.new("RGB", (1, 1))
-    draw = PIL.ImageDraw.Draw(img)
 
-    PAD = 20
-    # first, try to draw text to obtain required bounding box size
-    _, _, right, bottom = draw.textbbox((PAD, PAD), spaces, font=font)  # type: ignore
+def _split_leaderboard_rows(
+    leaderboard: Iterable[str | ColourFragment],
+) -> List[Leaderboard]:
+    """
+    Splits a leaderboard into its lines, each made up of fragments without newlines.
+    """
+    rows: List[Leaderboard] = [[]]
+    for frag in leaderboard:
+        text = frag if isinstance(frag, str) else frag.text
+        if "\n" not in text:
+            rows[-1].append(frag)
+            continue
+        for i, line in enumerate(text.split("\n")):
+            if i > 0:
+                rows.append([])
+            if line:
+                rows[-1].append(
+                    line if isinstance(frag, str) else ColourFragment(line, frag.colour)
+                )
+    return rows
 
-    img = PIL.Image.new("RGB", (int(right) + PAD, int(bottom) + PAD), BG_COLOUR)
-    draw = PIL.ImageDraw.Draw(img)
 
+def _render_row(row: Leaderboard) -> PIL.Image.Image:
+    """
+    Renders a single line of a leaderboard as a tile, using the row cache if possible.
+    Tiles are tall enough to include descenders, so adjacent tiles may overlap.
+    """
+    key = leaderboard_hash(row)
+    with _row_cache_lock:
+        if (tile := _row_cache.get(key)) is not None:
+            _row_cache.move_to_end(key)
+            return tile
+
+    _, layers = _isolate_leaderboard_layers(row)
+    font = _get_font()
+    ascent, descent = font.getmetrics()
+    width = max((font.getlength(text) for text in layers.values()), default=0)
+
+    tile = PIL.Image.new("RGB", (math.ceil(width), ascent + descent), BG_COLOUR)
+    draw = PIL.ImageDraw.Draw(tile)
     # draw each layer. layers should be disjoint
     for colour, text in layers.items():
-        draw.text((PAD, PAD), text, font=font, fill=colour)  # type: ignore
+        draw.text((0, 0), text, font=font, fill=colour)  # type: ignore
+
+    with _row_cache_lock:
+        _row_cache[key] = tile
+        while len(_row_cache) > ROW_CACHE_SIZE:
+            _row_cache.popitem(last=False)
+    return tile
+
+
+def render_leaderboard_to_image(leaderboard: Iterable[str | ColourFragment]) -> bytes:
+    """
+    Renders a leaderboard as a PNG. This is slow for large leaderboards, so use
+    render_leaderboard_to_image_cached from within the event loop.
+
+    Each line is rendered as a separate tile, which is cached by its content. This
+    means that rerendering a leaderboard where only a few rows have changed only
+    needs to draw the text of those rows.
+    """
+    tiles = [_render_row(row) for row in _split_leaderboard_rows(leaderboard)]
+    font = _get_font()
+
+    PAD = 20
+    # Match the line spacing pillow uses for multiline text
+    draw = PIL.ImageDraw.Draw(PIL.Image.new("RGB", (1, 1)))
+    line_height = int(draw.textbbox((0, 0), "A", font=font)[3]) + 4
+    tile_height = sum(font.getmetrics())
+
+    width = max((tile.width for tile in tiles), default=0)
+    height = (len(tiles) - 1) * line_height + tile_height
+    img = PIL.Image.new("RGB", (width + 2 * PAD, height + 2 * PAD), BG_COLOUR)
+
+    for i, tile in enumerate(tiles):
+        if tile.width == 0:
+            continue
+        box = (
+            PAD,
+            PAD + i * line_height,
+            PAD + tile.width,
+            PAD + i * line_height + tile_height,
+        )
+        # Text is always lighter than the background, so overlapping descenders
+        # from the previous row can be kept by taking the lighter of each pixel.
+        img.paste(PIL.ImageChops.lighter(img.crop(box), tile), box)
 
     buf = BytesIO()
     img.save(buf, format="PNG", optimize=True)
     return buf.getvalue()
 
 
-def build_leaderboard(
-    columns: List[LeaderboardColumn], members: List[Member], day: Optional[Day]
-):
+def _load_or_render_leaderboard(key: str, leaderboard: Leaderboard) -> bytes:
     """
-    Returns a leaderboard made up of fragments, with the given column configuration
-    and member rows.
+    Returns the image for a leaderboard from the disk cache if possible,
+    otherwise renders it (and stores it in the disk cache). Run within a render worker.
+    """
+    if IMAGE_CACHE_DIR is None:
+        return render_leaderboard_to_image(leaderboard)
+
+    path = os.path.join(IMAGE_CACHE_DIR, f"{key}.png")
+    try:
+        with open(path, "rb") as image_file:
+            image = image_file.read()
+        # Marks the image as recently used, so it is pruned last
+        os.utime(path)
+        return image
+    except OSError:
+        pass
+
+    image = render_leaderboard_to_image(leaderboard)
+    try:
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        # Write to a temporary file first, so a partial image is never read
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as image_file:
+            image_file.write(image)
+        os.replace(temporary_path, path)
+        _prune_image_cache(IMAGE_CACHE_DIR, IMAGE_DISK_CACHE_SIZE)
+    except OSError as exception:
+        logging.warning(f"Could not write leaderboard image to cache: {exception}")
+    return image
+
+
+def _prune_image_cache(directory: str, size: int):
     """
+    Removes the least recently used images from the disk cache, so that at most `size`
+    images remain.
+    """
+    with os.scandir(directory) as entries:
+        images = [
+            (entry.stat().st_mtime, entry.path)
+            for entry in entries
+            if entry.name.endswith(".png")
+        ]
+    if len(images) <= size:
+        return
+    images.sort()
+    for _, path in images[: len(images) - size]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # another worker has already removed it
+            pass
+
+
+async def render_leaderboard_to_image_cached(
+    leaderboard: Iterable[str | ColourFragment],
+) -> bytes:
+    """
+    Renders a leaderboard as a PNG within a worker thread, so that the event loop is
+    not blocked. Images are cached by the content of the leaderboard in memory (and on
+    disk, if IMAGE_CACHE_DIR is set), so identical leaderboards are only rendered once.
+    """
+    leaderboard = list(leaderboard)
+    key = leaderboard_hash(leaderboard)
+
+    # The memory cache is only accessed from the event loop, so needs no lock
+    if (image := _image_cache.get(key)) is not None:
+        _image_cache.move_to_end(key)
+        return image
+
+    loop = asyncio.get_running_loop()
+    image = await loop.run_in_executor(
+        _render_executor, _load_or_render_leaderboard, key, leaderboard
+    )
+
+    _image_cache[key] = image
+    _image_cache.move_to_end(key)
+    while len(_image_cache) > IMAGE_CACHE_SIZE:
+        _image_cache.popitem(last=False)
+    return image
+
+
+def _build_leaderboard_header(columns: List[LeaderboardColumn]) -> ColourFragment:
     header = "".join(column.title[0] for column in columns)
     header += "\n"
     header += "".join(column.title[1] for column in columns)
+    return ColourFragment(header, HL_COLOUR)
+
+
+def _build_leaderboard_rows(
+    columns: List[LeaderboardColumn],
+    members: List[Member],
+    day: Optional[Day],
+    start: int,
+) -> Leaderboard:
+    rows: Leaderboard = []
+    for id, member in enumerate(members, start=start):
+        rows.append("\n")
+        for column in columns:
+            rows.extend(column.calculation(member, id, day))
+    return rows
 
-    leaderboard: Leaderboard = [ColourFragment(header, HL_COLOUR)]
 
-    # Note that leaderboards start at 1, not 0
-    for id, member in enumerate(members, start=1):
-        leaderboard.append("\n")
-        for column in columns:
-            leaderboard.extend(column.calculation(member, id, day))
+def build_leaderboard(
+    columns: List[LeaderboardColumn],
+    members: List[Member],
+    day: Optional[Day],
+    start: int = 1,
+):
+    """
+    Returns a leaderboard made up of fragments, with the given column configuration
+    and member rows. The rows are numbered from start (leaderboards start at 1, not 0),
+    so that a single page of a larger leaderboard can be built.
+    """
+    return [_build_leaderboard_header(columns)] + _build_leaderboard_rows(
+        columns, members, day, start
+    )
 
-    return leaderboard
+
+def stream_leaderboard_text(
+    columns: List[LeaderboardColumn],
+    members: List[Member],
+    day: Optional[Day],
+    chunk_size: int = 100,
+) -> Iterator[str]:
+    """
+    Yields the text of a leaderboard a chunk of rows at a time, so that the
+    fragments of a large leaderboard never need to be built all at once.
+    """
+    yield _build_leaderboard_header(columns).text
+    for start in range(0, len(members), chunk_size):
+        yield render_leaderboard_to_text(
+            _build_leaderboard_rows(
+                columns, members[start : start + chunk_size], day, start + 1
+            )
+        )
@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+from zoneinfo import ZoneInfo
+
+from uqcsbot.utils.text_utils import MESSAGE_LENGTH_LIMIT, split_message
+
+REMINDER_TIMEZONE = ZoneInfo("Australia/Brisbane")
+
+# The longest the dispatcher will sleep before checking the clock again. This stops
+# a change of the system clock from delaying reminders for too long.
+MAX_SLEEP = timedelta(minutes=1)
+
+K = TypeVar("K")
+
+
+def next_occurrence(
+    start_date: date,
+    time_of_day: time,
+    week_frequency: int,
+    end_date: Optional[date],
+    after: datetime,
+    timezone: tzinfo = REMINDER_TIMEZONE,
+) -> Optional[datetime]:
+    """
+    Returns the first occurrence of a recurring reminder strictly after the (timezone
+    aware) datetime `after`, or None if the reminder has ended by then. The reminder
+    occurs at `time_of_day` in the given timezone, on `start_date` and then every
+    `week_frequency` weeks (or every day if `week_frequency` is 0), up to and
+    including `end_date`.
+
+    This is calculated directly, so takes the same time regardless of how long ago
+    the reminder started.
+    """
+    period = 7 * week_frequency if week_frequency > 0 else 1
+    local_after = after.astimezone(timezone)
+
+    # the number of whole periods from the start to the first occurrence on or after today
+    days_since_start = (local_after.date() - start_date).days
+    periods = max(0, -(-days_since_start // period))
+    next_date = start_date + timedelta(days=periods * period)
+    next_datetime = datetime.combine(next_date, time_of_day, tzinfo=timezone)
+    if next_datetime <= after:
+        # the occurrence today has already happened
+        next_date += timedelta(days=period)
+        next_datetime = datetime.combine(next_date, time_of_day, tzinfo=timezone)
+
+    if end_date is not None and next_date > end_date:
+        return None
+    return next_datetime
+
+
+def pack_messages(
+    texts: List[str], limit: int = MESSAGE_LENGTH_LIMIT, separator: str = "\n\n"
+) -> List[str]:
+    """
+    Combines texts (in order) into as few messages as possible, where each message is at
+    most `limit` characters long. A text that is too long by itself is split across
+    multiple messages.
+    """
+    messages: List[str] = []
+    current = ""
+    for text in texts:
+        if current and len(current) + len(separator) + len(text) <= limit:
+            current += separator + text
+            continue
+        if current:
+            messages.append(current)
+        *full_messages, current = split_message(text, limit)
+        messages.extend(full_messages)
+    if current:
+        messages.append(current)
+    return messages
+
+
+class _Entry(Generic[K]):
+    """
+    An entry within a ReminderQueue. Cancelled entries are left within the heap and
+    skipped when they reach the top, so that cancelling does not need to search the heap.
+    """
+
+    __slots__ = ("when", "order", "key", "cancelled")
+
+    def __init__(self, when: datetime, order: int, key: K):
+        self.when = when
+        self.order = order
+        self.key = key
+        self.cancelled = False
+
+    def __lt__(self, other: "_Entry[K]") -> bool:
+        return (self.when, self.order) < (other.when, other.order)
+
+
+class ReminderQueue(Generic[K]):
+    """
+    A min-heap of keys ordered by the time they are next due. Each key can be queued
+    at most once; pushing a key again replaces its previous time. Pushing and removing
+    both take O(log n) (amortised) time.
+    """
+
+    def __init__(self):
+        self._heap: List[_Entry[K]] = []
+        self._entries: Dict[K, _Entry[K]] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def push(self, key: K, when: datetime):
+        """Queues the key to be due at the given time."""
+        self.remove(key)
+        entry = _Entry(when, next(self._counter), key)
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, key: K) -> bool:
+        """Removes the key from the queue, returning whether it was queued."""
+        if (entry := self._entries.pop(key, None)) is None:
+            return False
+        entry.cancelled = True
+        # Rebuild the heap if it is mostly cancelled entries, to bound its size
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [entry for entry in self._heap if not entry.cancelled]
+            heapq.heapify(self._heap)
+        return True
+
+    def next_time(self) -> Optional[datetime]:
+        """Returns the time the earliest key is due, if there is one."""
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0].when if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[Tuple[K, datetime]]:
+        """Removes and returns all keys (with their times) due at or before now."""
+        due: List[Tuple[K, datetime]] = []
+        while (when := self.next_time()) is not None and when <= now:
+            entry = heapq.heappop(self._heap)
+            del self._entries[entry.key]
+            due.append((entry.key, when))
+        return due
+
+
+class ReminderDispatcher(Generic[K]):
+    """
+    Calls a callback with batches of keys once their scheduled times have passed. A
+    single asyncio task sleeps until the earliest scheduled time, and all keys that are
+    due when it wakes (e.g. reminders set for the same second) are handled together.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[List[Tuple[K, datetime]]], Awaitable[None]],
+        clock: Callable[[], datetime] = lambda: datetime.now(tz=REMINDER_TIMEZONE),
+    ):
+        self._callback = callback
+        self._clock = clock
+        self._queue: ReminderQueue[K] = ReminderQueue()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._queue
+
+    def schedule(self, key: K, when: datetime):
+        """
+        Schedules the key to be dispatched at the given (timezone aware) time, replacing
+        any previous time for that key. Times in the past are dispatched immediately.
+        """
+        self._queue.push(key, when)
+        if self._queue.next_time() == when:
+            self._wakeup.set()
+
+    def cancel(self, key: K) -> bool:
+        """Cancels a scheduled key, returning whether it was scheduled."""
+        return self._queue.remove(key)
+
+    def start(self):
+        """Starts dispatching within the running event loop, if not already started."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stops dispatching. Scheduled keys are kept, so dispatching can be restarted."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = self._clock()
+            if due := self._queue.pop_due(now):
+                try:
+                    await self._callback(due)
+                except Exception:
+                    logging.exception(f"Error dispatching {len(due)} reminder(s)")
+                continue
+
+            timeout = MAX_SLEEP.total_seconds()
+            if (next_time := self._queue.next_time()) is not None:
+                timeout = min(timeout, (next_time - now).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
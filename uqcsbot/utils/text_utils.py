@@ -0,0 +1,115 @@
+import re
+from functools import lru_cache
+from string import ascii_lowercase, ascii_uppercase
+from typing import Any, Dict, List
+
+import discord
+
+# The maximum length of a Discord message
+MESSAGE_LENGTH_LIMIT = 2000
+
+# Matches a Discord emote, capturing its name
+EMOTE_REGEX = re.compile(r"<a?:(\w+):\d+>")
+
+# The 8 bit binary string of each byte, indexed by the byte
+BYTE_BITS = tuple(f"{byte:08b}" for byte in range(256))
+
+
+def replace_emotes_with_names(message: str) -> str:
+    """
+    Replaces all emotes in the message with their emote name (e.g. ":disapproval:")
+    instead of their id.
+    """
+    return EMOTE_REGEX.sub(r":\1:", message)
+
+
+def sanitise_illegals(
+    message: str, code_marker: str = "`", replacement: str = ""
+) -> str:
+    """
+    Strips whitespace from either side of the message, and replaces each code_marker
+    (which would start or end a code block) with the replacement.
+    """
+    return message.strip().replace(code_marker, replacement)
+
+
+@lru_cache(maxsize=26)
+def _caesar_table(distance: int) -> Dict[int, int]:
+    return str.maketrans(
+        ascii_uppercase + ascii_lowercase,
+        ascii_uppercase[distance:]
+        + ascii_uppercase[:distance]
+        + ascii_lowercase[distance:]
+        + ascii_lowercase[:distance],
+    )
+
+
+def caesar_table(distance: int) -> Dict[int, int]:
+    """
+    Returns a str.translate table that shifts ASCII letters the given distance
+    through the alphabet, keeping their case. Other characters are unchanged.
+    """
+    return _caesar_table(distance % 26)
+
+
+def substitution_table(
+    substitutions: Dict[str, str], suffix: str = ""
+) -> Dict[int, str]:
+    """
+    Returns a str.translate table that replaces each character in substitutions
+    with its substitution (followed by the suffix).
+    """
+    return {
+        ord(character): substitution + suffix
+        for character, substitution in substitutions.items()
+    }
+
+
+def deletion_table(characters: str) -> Dict[int, None]:
+    """
+    Returns a str.translate table that removes the given characters. Translating
+    with this leaves only the characters not given, which is a quick way to find
+    unsupported characters.
+    """
+    return dict.fromkeys(map(ord, characters))
+
+
+def bytes_to_bits(data: bytes) -> str:
+    """Returns the 8 bit binary strings of the bytes, joined together."""
+    return "".join(map(BYTE_BITS.__getitem__, data))
+
+
+def split_message(text: str, limit: int = MESSAGE_LENGTH_LIMIT) -> List[str]:
+    """
+    Splits text into as few messages as possible that are at most `limit` characters
+    long. Messages are split at the last newline or space that keeps them within the
+    limit, if there is one in the second half of the message.
+    """
+    messages: List[str] = []
+    start = 0
+    while len(text) - start > limit:
+        end = start + limit
+        split = max(text.rfind("\n", start, end), text.rfind(" ", start, end))
+        if split > start + limit // 2:
+            end = split + 1
+        messages.append(text[start:end])
+        start = end
+    if start < len(text) or not messages:
+        messages.append(text[start:])
+    return messages
+
+
+async def send_split_message(
+    interaction: discord.Interaction,
+    text: str,
+    limit: int = MESSAGE_LENGTH_LIMIT,
+    **kwargs: Any,
+):
+    """
+    Responds to the interaction with the text, sending any text past Discord's
+    character limit in follow up messages.
+    """
+    first, *rest = split_message(text, limit)
+    await interaction.response.send_message(first, **kwargs)
+    for message in rest:
+        await interaction.followup.send(message, **kwargs)
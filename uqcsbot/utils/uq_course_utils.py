@@ -1,12 +1,18 @@
 import requests
 from requests.exceptions import RequestException
-from datetime import datetime
+from datetime import datetime, timedelta
 from dateutil import parser
 from bs4 import BeautifulSoup, element
-from typing import Optional, Literal
-from dataclasses import dataclass
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Callable, Iterable, Optional, Literal
+from dataclasses import asdict, dataclass
 import json
+import logging
 import re
+import threading
+
+from uqcsbot.models import CourseCacheEntries, CourseQueries
 
 BASE_COURSE_URL = "https://my.uq.edu.au/programs-courses/course.html?course_code="
 BASE_ASSESSMENT_URL = (
@@ -19,6 +25,16 @@ BASE_PAST_EXAMS_URL = "https://api.library.uq.edu.au/v1/exams/search/"
 OFFERING_PARAMETER = "offer"
 YEAR_PARAMETER = "year"
 
+# How long course profile URLs and assessment are cached for. These rarely change
+# once a course profile is released.
+COURSE_CACHE_TTL = timedelta(hours=12)
+# How long a missing course profile is cached for. This is shorter, as profiles are
+# often released in the weeks before semester.
+COURSE_CACHE_NOT_FOUND_TTL = timedelta(hours=1)
+# How long prefetched course information is cached for. This lasts until the next
+# nightly prefetch, with some leeway in case it runs late.
+COURSE_PREFETCH_TTL = timedelta(hours=26)
+
 
 class Offering:
     """
@@ -261,6 +277,164 @@ def get_uq_request(
         raise HttpException(message, 500)
 
 
+class CourseCache:
+    """
+    A cache of information about courses (e.g. course profile URLs), keyed by the kind
+    of information, the course code and the offering code (see Offering.get_offering_code).
+    Values are JSON encoded, and None records that the information could not be found.
+    Entries expire after a TTL, so that changes to course profiles are eventually seen.
+
+    If a database is given (see use_database), entries are also stored in it, so that
+    they survive restarts. This is safe to use from multiple threads.
+
+    Expired entries are removed from memory as they are found, and all of them every
+    COURSE_CACHE_NOT_FOUND_TTL. They are only removed from the database by purge_expired,
+    which is run by the nightly prefetch.
+    """
+
+    Key = tuple[str, str, str]
+
+    def __init__(self):
+        self._entries: dict[CourseCache.Key, tuple[Optional[str], datetime]] = {}
+        self._lock = threading.Lock()
+        self._create_db_session: Optional[Callable[[], Session]] = None
+        self._next_sweep = datetime.now() + COURSE_CACHE_NOT_FOUND_TTL
+
+    def use_database(self, create_db_session: Callable[[], Session]):
+        """
+        Stores entries in the database from now on, and loads entries from it that
+        are not in memory.
+        """
+        self._create_db_session = create_db_session
+
+    def clear(self):
+        """Removes all entries from memory (but not the database)."""
+        with self._lock:
+            self._entries.clear()
+
+    def get(
+        self, kind: str, course_code: str, offering_code: str
+    ) -> tuple[bool, Optional[str]]:
+        """
+        Returns whether an unexpired entry exists, and its value if it does.
+        """
+        key = (kind, course_code.upper(), offering_code)
+        now = datetime.now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                return False, None
+        if entry is None:
+            entry = self._load(key, now)
+        if entry is None:
+            return False, None
+        return True, entry[0]
+
+    def set(
+        self,
+        kind: str,
+        course_code: str,
+        offering_code: str,
+        value: Optional[str],
+        ttl: timedelta = COURSE_CACHE_TTL,
+    ):
+        """
+        Stores a value (or None if the information could not be found) for the given TTL.
+        """
+        key = (kind, course_code.upper(), offering_code)
+        now = datetime.now()
+        with self._lock:
+            self._entries[key] = (value, now + ttl)
+            if now >= self._next_sweep:
+                self._remove_expired(now)
+        self._store(key, value, now + ttl)
+
+    def purge_expired(self) -> int:
+        """
+        Removes all expired entries from memory and the database, returning the number
+        removed from the database.
+        """
+        now = datetime.now()
+        with self._lock:
+            self._remove_expired(now)
+        if self._create_db_session is None:
+            return 0
+        db_session = self._create_db_session()
+        try:
+            removed = (
+                db_session.query(CourseCacheEntries)
+                .filter(CourseCacheEntries.expires <= now)
+                .delete(synchronize_session=False)
+            )
+            db_session.commit()
+        finally:
+            db_session.close()
+        return removed
+
+    def _remove_expired(self, now: datetime):
+        """Removes expired entries from memory. The lock must be held."""
+        self._entries = {
+            key: entry for key, entry in self._entries.items() if entry[1] > now
+        }
+        self._next_sweep = now + COURSE_CACHE_NOT_FOUND_TTL
+
+    def _load(
+        self, key: Key, now: datetime
+    ) -> Optional[tuple[Optional[str], datetime]]:
+        if self._create_db_session is None:
+            return None
+        try:
+            db_session = self._create_db_session()
+            try:
+                row = db_session.get(CourseCacheEntries, key)
+                entry = None if row is None else (row.value, row.expires)
+            finally:
+                db_session.close()
+        except Exception:
+            # The cache still works without the database, it just won't persist
+            logging.exception("Could not load course cache entry from the database")
+            return None
+        if entry is None or entry[1] <= now:
+            return None
+        with self._lock:
+            self._entries.setdefault(key, entry)
+        return entry
+
+    def _store(self, key: Key, value: Optional[str], expires: datetime):
+        if self._create_db_session is None:
+            return
+        kind, course_code, offering_code = key
+        try:
+            db_session = self._create_db_session()
+            try:
+                db_session.merge(
+                    CourseCacheEntries(
+                        kind=kind,
+                        course_code=course_code,
+                        offering_code=offering_code,
+                        value=value,
+                        expires=expires,
+                    )
+                )
+                db_session.commit()
+            finally:
+                db_session.close()
+        except Exception:
+            logging.exception("Could not store course cache entry in the database")
+
+
+course_cache = CourseCache()
+
+
+def _cache_offering_code(offering: Optional[Offering], year: Optional[int]) -> str:
+    """
+    Returns the offering part of a course cache key, which includes the year if given.
+    """
+    offering_code = offering.get_offering_code() if offering else ""
+    return f"{offering_code}:{year}" if year else offering_code
+
+
 def get_course_profile_url(
     course_name: str,
     offering: Optional[Offering] = None,
@@ -269,7 +443,44 @@ def get_course_profile_url(
     """
     Returns the URL to the course profile (ECP) for the given course for a given offering.
     If no offering or year are given, the first course profile on the course page will be returned.
+    Results (including missing profiles) are cached, see CourseCache.
     """
+    offering_code = _cache_offering_code(offering, year)
+    found, value = course_cache.get("profile_url", course_name, offering_code)
+    if found:
+        if value is None:
+            raise ProfileNotFoundException(course_name, offering)
+        return json.loads(value)
+    return _fetch_and_cache_course_profile_url(course_name, offering, year)
+
+
+def _fetch_and_cache_course_profile_url(
+    course_name: str,
+    offering: Optional[Offering] = None,
+    year: Optional[int] = None,
+    ttl: timedelta = COURSE_CACHE_TTL,
+) -> str:
+    offering_code = _cache_offering_code(offering, year)
+    try:
+        url = _fetch_course_profile_url(course_name, offering, year)
+    except ProfileNotFoundException:
+        course_cache.set(
+            "profile_url",
+            course_name,
+            offering_code,
+            None,
+            COURSE_CACHE_NOT_FOUND_TTL,
+        )
+        raise
+    course_cache.set("profile_url", course_name, offering_code, json.dumps(url), ttl)
+    return url
+
+
+def _fetch_course_profile_url(
+    course_name: str,
+    offering: Optional[Offering] = None,
+    year: Optional[int] = None,
+) -> str:
     course_url = BASE_COURSE_URL + course_name
     if offering:
         course_url += "&" + OFFERING_PARAMETER + "=" + offering.get_offering_code()
@@ -306,7 +517,22 @@ def get_current_exam_period() -> tuple[datetime, datetime]:
 
     Note: Assumes that Semester 1 always occurs before or
     during June, with Semester 2 occurring after.
+    Results are cached, see CourseCache.
     """
+    today = datetime.today()
+    current_semester = "1" if today.month <= 6 else "2"
+    found, value = course_cache.get(
+        "exam_period", "", f"{today.year}:{current_semester}"
+    )
+    if found and value is not None:
+        start, end = json.loads(value)
+        return datetime.fromisoformat(start), datetime.fromisoformat(end)
+    return _fetch_and_cache_current_exam_period()
+
+
+def _fetch_and_cache_current_exam_period(
+    ttl: timedelta = COURSE_CACHE_TTL,
+) -> tuple[datetime, datetime]:
     today = datetime.today()
     current_calendar_url = BASE_CALENDAR_URL + str(today.year)
     http_response = get_uq_request(current_calendar_url)
@@ -323,17 +549,62 @@ def get_current_exam_period() -> tuple[datetime, datetime]:
     start_day, end_date = exam_date_text[len(exam_snippet) :].split(" - ")
     end_datetime = parser.parse(end_date)
     start_datetime = end_datetime.replace(day=int(start_day))
+    course_cache.set(
+        "exam_period",
+        "",
+        f"{today.year}:{current_semester}",
+        json.dumps([start_datetime.isoformat(), end_datetime.isoformat()]),
+        ttl,
+    )
     return start_datetime, end_datetime
 
 
 def get_course_assessment_items(
     course_name: str,
     offering: Offering,
+    course_profile_url: Optional[str] = None,
 ) -> list[AssessmentItem]:
     """
     Returns all the assessment for the given course.
+    If the course profile URL for the offering is already known (from get_course_profile_url), it
+    can be given to avoid requesting the course page again.
+    Results are cached, see CourseCache.
     """
-    course_profile_url = get_course_profile_url(course_name, offering=offering)
+    offering_code = offering.get_offering_code()
+    found, value = course_cache.get("assessment", course_name, offering_code)
+    if found and value is not None:
+        return [AssessmentItem(**item) for item in json.loads(value)]
+    return _fetch_and_cache_course_assessment_items(
+        course_name, offering, course_profile_url
+    )
+
+
+def _fetch_and_cache_course_assessment_items(
+    course_name: str,
+    offering: Offering,
+    course_profile_url: Optional[str] = None,
+    ttl: timedelta = COURSE_CACHE_TTL,
+) -> list[AssessmentItem]:
+    assessment = _fetch_course_assessment_items(
+        course_name, offering, course_profile_url
+    )
+    course_cache.set(
+        "assessment",
+        course_name,
+        offering.get_offering_code(),
+        json.dumps([asdict(item) for item in assessment]),
+        ttl,
+    )
+    return assessment
+
+
+def _fetch_course_assessment_items(
+    course_name: str,
+    offering: Offering,
+    course_profile_url: Optional[str] = None,
+) -> list[AssessmentItem]:
+    if course_profile_url is None:
+        course_profile_url = get_course_profile_url(course_name, offering=offering)
     course_assessment_url = course_profile_url + "#assessment"
 
     http_response = get_uq_request(course_assessment_url)
@@ -410,7 +681,29 @@ def get_past_exams(course_code: str) -> list[Exam]:
     """
     Takes the course code and generates each result in the format:
     ('year Sem X:', link)
+    Results are cached, see CourseCache.
     """
+    found, value = course_cache.get("past_exams", course_code, "")
+    if found and value is not None:
+        return [Exam(**exam) for exam in json.loads(value)]
+    return _fetch_and_cache_past_exams(course_code)
+
+
+def _fetch_and_cache_past_exams(
+    course_code: str, ttl: timedelta = COURSE_CACHE_TTL
+) -> list[Exam]:
+    exam_list = _fetch_past_exams(course_code)
+    course_cache.set(
+        "past_exams",
+        course_code,
+        "",
+        json.dumps([vars(exam) for exam in exam_list]),
+        ttl,
+    )
+    return exam_list
+
+
+def _fetch_past_exams(course_code: str) -> list[Exam]:
     url = get_past_exams_page_url(course_code)
     http_response = requests.get(url)
     if http_response.status_code != requests.codes.ok:
@@ -431,3 +724,103 @@ def get_past_exams(course_code: str) -> list[Exam]:
         link = exam_json[0]["paperUrl"]
         exam_list.append(Exam(year, semester, link))
     return exam_list
+
+
+def prefetch_course(course_name: str, offering: Offering):
+    """
+    Fetches the past exams, course profile URL (which is also the ECP link) and assessment
+    of the given course into the course cache, replacing any cached entries so that they
+    last until the next prefetch.
+    """
+    _fetch_and_cache_past_exams(course_name, COURSE_PREFETCH_TTL)
+    profile_url = _fetch_and_cache_course_profile_url(
+        course_name, offering, ttl=COURSE_PREFETCH_TTL
+    )
+    _fetch_and_cache_course_assessment_items(
+        course_name, offering, profile_url, COURSE_PREFETCH_TTL
+    )
+
+
+def prefetch_current_exam_period():
+    """
+    Fetches the current exam period into the course cache, so that it lasts until the
+    next prefetch.
+    """
+    _fetch_and_cache_current_exam_period(COURSE_PREFETCH_TTL)
+
+
+def record_course_queries(
+    create_db_session: Callable[[], Session], course_codes: Iterable[str]
+):
+    """
+    Counts a query for each of the given courses, so that popular courses can be prefetched.
+    This is a single upsert, so concurrent first queries for a course are both counted.
+    Counting is best-effort: errors are logged rather than raised, so that they never
+    break the command being counted.
+    """
+    now = datetime.now()
+    rows = [
+        {"course_code": course_code, "count": 1, "last_queried": now}
+        for course_code in sorted(set(code.upper() for code in course_codes))
+    ]
+    if not rows:
+        return
+    try:
+        db_session = create_db_session()
+        try:
+            dialect = db_session.get_bind().dialect.name
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            statement = insert(CourseQueries).values(rows)
+            db_session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[CourseQueries.course_code],
+                    set_={
+                        "count": CourseQueries.count + 1,
+                        "last_queried": statement.excluded.last_queried,
+                    },
+                )
+            )
+            db_session.commit()
+        finally:
+            db_session.close()
+    except Exception:
+        logging.exception(f"Could not record queries for courses: {course_codes}")
+
+
+def remove_unpopular_courses(
+    create_db_session: Callable[[], Session], before: datetime
+) -> int:
+    """
+    Stops counting queries for courses that haven't been queried since the given time,
+    returning the number of courses removed.
+    """
+    db_session = create_db_session()
+    try:
+        removed = (
+            db_session.query(CourseQueries)
+            .filter(CourseQueries.last_queried < before)
+            .delete(synchronize_session=False)
+        )
+        db_session.commit()
+    finally:
+        db_session.close()
+    return removed
+
+
+def get_popular_courses(
+    create_db_session: Callable[[], Session], limit: int, since: datetime
+) -> list[str]:
+    """
+    Returns the (at most) limit most queried courses that have been queried since the given time.
+    """
+    db_session = create_db_session()
+    try:
+        return [
+            course_queries.course_code
+            for course_queries in db_session.query(CourseQueries)
+            .filter(CourseQueries.last_queried >= since)
+            .order_by(CourseQueries.count.desc(), CourseQueries.course_code)
+            .limit(limit)
+        ]
+    finally:
+        db_session.close()
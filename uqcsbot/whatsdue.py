@@ -1,11 +1,15 @@
+import asyncio
 from datetime import datetime, timedelta
 import logging
+import threading
 from typing import Optional, Callable, Literal
 
 import discord
 from discord import app_commands
 from discord.ext import commands
+from sqlalchemy.orm import Session
 
+from uqcsbot.bot import UQCSBot
 from uqcsbot.yelling import yelling_exemptor
 
 from uqcsbot.utils.uq_course_utils import (
@@ -15,11 +19,23 @@ from uqcsbot.utils.uq_course_utils import (
     HttpException,
     ProfileNotFoundException,
     AssessmentItem,
+    course_cache,
     get_course_assessment_items,
     get_course_profile_url,
+    get_popular_courses,
+    prefetch_course,
+    prefetch_current_exam_period,
+    record_course_queries,
+    remove_unpopular_courses,
 )
 
 AssessmentSortType = Literal["Date", "Course Name", "Weight"]
+# The most courses to fetch from UQ at once for a single command
+MAX_CONCURRENT_COURSE_FETCHES = 4
+# The number of most queried courses to prefetch each night, and how recently they
+# must have been queried
+PREFETCH_COURSE_COUNT = 50
+PREFETCH_QUERY_PERIOD = timedelta(weeks=16)
 ECP_ASSESSMENT_URL = (
     "https://course-profiles.uq.edu.au/student_section_loader/section_5/"
 )
@@ -43,8 +59,64 @@ SORT_METHODS: dict[
 
 
 class WhatsDue(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: UQCSBot):
         self.bot = bot
+        self.bot.schedule_task(
+            self.prefetch_popular_courses,
+            trigger="cron",
+            hour=3,
+            minute=0,
+            timezone="Australia/Brisbane",
+        )
+
+    async def prefetch_popular_courses(self):
+        """
+        Fetches the most queried courses for the current offering into the course cache
+        overnight, so that queries for them during the day do not need to contact UQ.
+        Expired entries are removed from the cache first, and courses that haven't been
+        queried within PREFETCH_QUERY_PERIOD are no longer counted.
+        """
+        try:
+            removed = await asyncio.to_thread(
+                remove_unpopular_courses,
+                self.bot.create_db_session,
+                datetime.now() - PREFETCH_QUERY_PERIOD,
+            )
+            logging.info(f"Removed {removed} courses not queried recently")
+        except Exception as e:
+            logging.warning(f"Could not remove courses not queried recently: {e}")
+        course_names = await asyncio.to_thread(
+            get_popular_courses,
+            self.bot.create_db_session,
+            PREFETCH_COURSE_COUNT,
+            datetime.now() - PREFETCH_QUERY_PERIOD,
+        )
+        offering = Offering(semester=None)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_COURSE_FETCHES)
+
+        async def prefetch(course_name: str) -> bool:
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(prefetch_course, course_name, offering)
+                    return True
+                except Exception as e:
+                    # Missing profiles are expected (e.g. courses not offered this semester)
+                    logging.info(f"Could not prefetch {course_name}: {e}")
+                    return False
+
+        try:
+            removed = await asyncio.to_thread(course_cache.purge_expired)
+            logging.info(f"Purged {removed} expired course cache entries")
+        except Exception as e:
+            logging.warning(f"Could not purge expired course cache entries: {e}")
+        try:
+            await asyncio.to_thread(prefetch_current_exam_period)
+        except Exception as e:
+            logging.warning(f"Could not prefetch the current exam period: {e}")
+        prefetched = await asyncio.gather(*map(prefetch, course_names))
+        logging.info(
+            f"Prefetched {sum(prefetched)}/{len(course_names)} popular courses"
+        )
 
     @app_commands.command()
     @app_commands.describe(
@@ -80,7 +152,8 @@ class WhatsDue(commands.Cog):
 
         await interaction.response.defer(thinking=True)
 
-        course_names = [c.upper() for c in courses.split()]
+        # Each course is only fetched once, even if given more than once
+        course_names = list(dict.fromkeys(c.upper() for c in courses.split()))
         offering = Offering(semester=semester, campus=campus, mode=mode)
 
         # If full output is not specified, set the cutoff to today's date.
@@ -93,21 +166,46 @@ class WhatsDue(commands.Cog):
             ),
         )
 
+        # Fetch every course concurrently (at most MAX_CONCURRENT_COURSE_FETCHES at a time),
+        # showing what has been found so far as each course arrives
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_COURSE_FETCHES)
+        stopped = threading.Event()
+        fetches = [
+            asyncio.create_task(
+                _fetch_course(
+                    course_name,
+                    offering,
+                    cutoff,
+                    semaphore,
+                    stopped,
+                    self.bot.create_db_session,
+                )
+            )
+            for course_name in course_names
+        ]
+        profile_urls: dict[str, str] = {}
+        assessment: list[AssessmentItem] = []
         try:
-            assessment = [
-                get_course_assessment_items(course_name, offering)
-                for course_name in course_names
-            ]
-            assessment = [
-                item
-                for course in assessment
-                for item in course
-                if item.is_after(cutoff[0]) and item.is_before(cutoff[1])
-            ]
+            for fetch in asyncio.as_completed(fetches):
+                course_name, profile_url, course_assessment = await fetch
+                profile_urls[course_name] = profile_url
+                assessment.extend(course_assessment)
+                if len(profile_urls) < len(course_names):
+                    await interaction.edit_original_response(
+                        embed=_build_embed(
+                            course_names,
+                            assessment,
+                            profile_urls,
+                            fulloutput,
+                            sort_order,
+                            reverse_sort,
+                            show_ecp_links,
+                        )
+                    )
         except HttpException as e:
             logging.error(e.message)
             await interaction.edit_original_response(
-                content=f"An error occurred, please try again."
+                content=f"An error occurred, please try again.", embed=None
             )
             return
         except (
@@ -115,51 +213,124 @@ class WhatsDue(commands.Cog):
             ProfileNotFoundException,
             AssessmentNotFoundException,
         ) as e:
-            await interaction.edit_original_response(content=e.message)
+            await interaction.edit_original_response(content=e.message, embed=None)
             return
+        finally:
+            # Stop any other fetches (including those already in a thread, before their
+            # next request), and retrieve their exceptions so they aren't logged as unhandled
+            stopped.set()
+            for fetch in fetches:
+                fetch.cancel()
+            await asyncio.gather(*fetches, return_exceptions=True)
 
-        embed = discord.Embed(
-            title=f"What's Due: {', '.join(course_names)}",
-            description="*WARNING: Assessment information may vary/change/be entirely different! Use at your own discretion. Check your ECP for a true list of assessment.*",
-        )
-        if assessment:
-            assessment.sort(key=SORT_METHODS[sort_order], reverse=reverse_sort)
-            for assessment_item in assessment:
-                embed.add_field(
-                    name=assessment_item.course_name,
-                    value=f"`{assessment_item.weight}` [{assessment_item.task}]({assessment_item.task_details_url}) ({assessment_item.category})\n{assessment_item.due_date}",
-                    inline=False,
-                )
-        elif fulloutput:
-            embed.add_field(
-                name="",
-                value=f"No assessment items could be found",
-            )
-        else:
-            embed.add_field(
-                name="",
-                value=f"Nothing seems to be due soon",
+        await interaction.edit_original_response(
+            embed=_build_embed(
+                course_names,
+                assessment,
+                profile_urls,
+                fulloutput,
+                sort_order,
+                reverse_sort,
+                show_ecp_links,
             )
+        )
+
+
+async def _fetch_course(
+    course_name: str,
+    offering: Offering,
+    cutoff: tuple[datetime, datetime],
+    semaphore: asyncio.Semaphore,
+    stopped: threading.Event,
+    create_db_session: Callable[[], Session],
+) -> tuple[str, str, list[AssessmentItem]]:
+    """
+    Returns the course profile URL and the assessment for the given course within the cutoff,
+    without blocking the event loop. The course page is only requested once, as its profile URL
+    is reused. Once stopped is set, no more requests are made and the result is incomplete.
+    The course is counted as queried (see record_course_queries) once its profile is found.
+    """
+
+    def fetch() -> tuple[str, list[AssessmentItem]]:
+        profile_url = get_course_profile_url(course_name, offering)
+        record_course_queries(create_db_session, [course_name])
+        if stopped.is_set():
+            return profile_url, []
+        assessment = get_course_assessment_items(course_name, offering, profile_url)
+        # Checking due dates may also need to request the exam period
+        return profile_url, [
+            item
+            for item in assessment
+            if item.is_after(cutoff[0]) and item.is_before(cutoff[1])
+        ]
+
+    async with semaphore:
+        profile_url, assessment = await asyncio.to_thread(fetch)
+    return course_name, profile_url, assessment
+
 
-        if show_ecp_links:
-            ecp_links = [
-                f"[{course_name}]({get_course_profile_url(course_name) + '#assessment'})"
-                for course_name in course_names
-            ]
+def _build_embed(
+    course_names: list[str],
+    assessment: list[AssessmentItem],
+    profile_urls: dict[str, str],
+    fulloutput: bool,
+    sort_order: AssessmentSortType,
+    reverse_sort: bool,
+    show_ecp_links: bool,
+) -> discord.Embed:
+    """
+    Returns the embed listing the given assessment. If the profile URLs of some courses are
+    missing, they are still being fetched, and the embed says so.
+    """
+    embed = discord.Embed(
+        title=f"What's Due: {', '.join(course_names)}",
+        description="*WARNING: Assessment information may vary/change/be entirely different! Use at your own discretion. Check your ECP for a true list of assessment.*",
+    )
+    complete = len(profile_urls) == len(course_names)
+    if not complete:
+        embed.description = (
+            f"*Fetching assessment ({len(profile_urls)}/{len(course_names)} courses found)...*\n"
+            + (embed.description or "")
+        )
+
+    if assessment:
+        for assessment_item in sorted(
+            assessment, key=SORT_METHODS[sort_order], reverse=reverse_sort
+        ):
             embed.add_field(
-                name=f"Potential ECP {'Link' if len(course_names) == 1 else 'Links'}",
-                value=" ".join(ecp_links)
-                + "\nNote that these may not be the correct ECPs. Check the year and offering type.",
+                name=assessment_item.course_name,
+                value=f"`{assessment_item.weight}` [{assessment_item.task}]({assessment_item.task_details_url}) ({assessment_item.category})\n{assessment_item.due_date}",
                 inline=False,
             )
+    elif complete and fulloutput:
+        embed.add_field(
+            name="",
+            value=f"No assessment items could be found",
+        )
+    elif complete:
+        embed.add_field(
+            name="",
+            value=f"Nothing seems to be due soon",
+        )
 
-        if not fulloutput:
-            embed.set_footer(
-                text="Note: This may not be the full assessment list. Set fulloutput to True to see a potentially more complete list, or check your ECP for a true list of assessment."
-            )
+    if show_ecp_links and complete:
+        ecp_links = [
+            f"[{course_name}]({profile_urls[course_name] + '#assessment'})"
+            for course_name in course_names
+        ]
+        embed.add_field(
+            name=f"Potential ECP {'Link' if len(course_names) == 1 else 'Links'}",
+            value=" ".join(ecp_links)
+            + "\nNote that these may not be the correct ECPs. Check the year and offering type.",
+            inline=False,
+        )
 
-        await interaction.edit_original_response(embed=embed)
+    if not fulloutput:
+        embed.set_footer(
+            text="Note: This may not be the full assessment list. Set fulloutput to True to see a potentially more complete list, or check your ECP for a true list of assessment."
+        )
+    return embed
 
 
-async def setup(bot: commands.Bot):
+async def setup(bot: UQCSBot):
     await bot.add_cog(WhatsDue(bot))
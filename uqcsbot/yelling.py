@@ -1,8 +1,13 @@
+import asyncio
 import discord
-from typing import List, Dict, Callable, Any
+import inspect
+import logging
+import time
+from typing import List, Dict, Callable, Any, Optional, Sequence, Set
 from discord.ext import commands
 from random import choice, random
 import re
+from sqlalchemy.orm import Session
 
 from uqcsbot.bot import UQCSBot
 from uqcsbot.cog import UQCSBotCog
@@ -11,6 +16,22 @@ from uqcsbot.models import YellingBans
 from datetime import timedelta
 from functools import wraps
 
+
+class _YellingTargets:
+    """
+    The #yelling channel and disapproval emoji, as used by yelling_exemptor. These are
+    found by the Yelling cog when the bot is ready (and again if channels or emoji
+    change), so that the decorator does not need to search for them on every command.
+    """
+
+    def __init__(self):
+        # 0 is never a channel id, so no interaction matches until the channel is found
+        self.channel_id: int = 0
+        self.disapproval_emoji: Optional[discord.Emoji] = None
+
+
+_yelling_targets = _YellingTargets()
+
 """
 This decorator that ensures that certain arguments of a command are checked if used in the #yelling channel.
 Provide it with the list of names of keyword arguments that the #yelling check should be applied to.
@@ -20,58 +41,263 @@ Use after the decorator @app_commands.command().
 
 def yelling_exemptor(input_args: List[str] = ["text"]) -> Callable[..., Any]:
     def handler(func: Callable[..., Any]):
+        # Find where the interaction is passed to the command (after self) now, rather than on every call
+        parameters = list(inspect.signature(func).parameters.values())[1:]
+        interaction_index = next(
+            (
+                i
+                for i, parameter in enumerate(parameters)
+                if parameter.annotation is discord.Interaction
+                or parameter.name == "interaction"
+            ),
+            None,
+        )
+        if interaction_index is None:
+            raise TypeError(
+                f"{func.__qualname__} must take an interaction to use yelling_exemptor"
+            )
+        interaction_name = parameters[interaction_index].name
+
         @wraps(func)
         async def wrapper(
             cogself: UQCSBotCog, *args: List[Any], **kwargs: Dict[str, Any]
         ):
-            bot = cogself.bot
-            interaction = None
-            text = "".join([str(kwargs.get(i, "") or "") for i in input_args])
-            if text == "":
-                await func(cogself, *args, **kwargs)
-                return
-            for a in args:
-                if isinstance(a, discord.interactions.Interaction):
-                    interaction = a
-                    break
-            if interaction is None:
-                await func(cogself, *args, **kwargs)
-                return
-            if not hasattr(interaction, "channel"):
-                await func(cogself, *args, **kwargs)
-                return
-            if interaction.channel is None:
-                await func(cogself, *args, **kwargs)
-                return
-            if interaction.channel.type != discord.ChannelType.text:
+            interaction = (
+                args[interaction_index]
+                if interaction_index < len(args)
+                else kwargs[interaction_name]
+            )
+            if not isinstance(interaction, discord.Interaction):
                 await func(cogself, *args, **kwargs)
                 return
-            if interaction.channel.name != "yelling":
+            if interaction.channel_id != _yelling_targets.channel_id:
                 await func(cogself, *args, **kwargs)
                 return
+            text = "".join([str(kwargs.get(i, "") or "") for i in input_args])
             if not Yelling.contains_lowercase(text):
                 await func(cogself, *args, **kwargs)
                 return
 
             await interaction.response.send_message(  # type: ignore
-                str(discord.utils.get(bot.emojis, name="disapproval") or "")
+                str(_yelling_targets.disapproval_emoji or "")
             )
             if isinstance(interaction.user, discord.Member):
-                await Yelling.external_handle_bans(bot, interaction.user)
+                await Yelling.external_handle_bans(cogself.bot, interaction.user)
 
         return wrapper
 
     return handler
 
 
+# Matches everything that clean_text changes, so that a message can be cleaned in a single pass:
+# emoji, links (a slightly more permissive version of discord's url regex, which matches
+# absolutely anything between http(s):// and whitespace) and escaped characters. Each
+# alternative starts with a literal character, which lets the regex engine skip quickly
+# to the next possible match.
+_CLEAN_PATTERN = re.compile(r"<a?:\w{2,32}:\d{18,22}>|https?://\S+|&(gt|lt|amp);")
+_ENTITIES = {"gt": ">", "lt": "<", "amp": "&"}
+
+
+def _clean_match(match: re.Match[str]) -> str:
+    """Upper-cases emoji and links (so they are ignored), and unescapes escaped characters."""
+    if (entity := match.group(1)) is not None:
+        return _ENTITIES[entity]
+    return match.group(0).upper()
+
+
+class YellingOffences:
+    """
+    Tracks how many times each user has been caught not yelling. Counts are kept in
+    memory so that bans can be applied immediately, and changed counts are written to
+    the database in periodic batches (and when the cog is unloaded). Only one write
+    runs at a time, so that a flush can't overwrite a decay with older counts.
+    """
+
+    def __init__(self, create_db_session: Callable[[], Session]):
+        self.create_db_session = create_db_session
+        self._counts: Dict[int, int] = {}
+        # users whose counts have changed since they were last written to the database
+        self._dirty: Set[int] = set()
+        self._write_lock = asyncio.Lock()
+
+    def load(self):
+        """Loads all offence counts from the database, replacing those in memory"""
+        db_session = self.create_db_session()
+        self._counts = {ban.user_id: ban.value for ban in db_session.query(YellingBans)}
+        db_session.close()
+        self._dirty.clear()
+
+    def offences(self, user_id: int) -> int:
+        """Returns the number of offences the given user currently has"""
+        return self._counts.get(user_id, 0)
+
+    def record_offence(self, user_id: int) -> int:
+        """Records an offence for the given user, returning their previous number of offences"""
+        previous_offences = self._counts.get(user_id, 0)
+        self._counts[user_id] = previous_offences + 1
+        self._dirty.add(user_id)
+        return previous_offences
+
+    def _take_dirty(self) -> Dict[int, int]:
+        """Returns the changed counts that need to be written, and marks them as clean"""
+        pending = {
+            user_id: self._counts[user_id]
+            for user_id in self._dirty
+            if user_id in self._counts
+        }
+        self._dirty.clear()
+        return pending
+
+    def _write(self, pending: Dict[int, int], decay: bool = False):
+        """
+        Writes the given counts to the database in one transaction, then optionally
+        decays all counts with two set-based statements.
+        """
+        start_time = time.perf_counter()
+        db_session = self.create_db_session()
+        try:
+            if pending:
+                existing = {
+                    user_id
+                    for (user_id,) in db_session.query(YellingBans.user_id).filter(
+                        YellingBans.user_id.in_(pending)
+                    )
+                }
+                db_session.bulk_update_mappings(
+                    YellingBans,  # type: ignore
+                    [
+                        {"user_id": user_id, "value": value}
+                        for user_id, value in pending.items()
+                        if user_id in existing
+                    ],
+                )
+                db_session.bulk_insert_mappings(
+                    YellingBans,  # type: ignore
+                    [
+                        {"user_id": user_id, "value": value}
+                        for user_id, value in pending.items()
+                        if user_id not in existing
+                    ],
+                )
+            removed = decremented = 0
+            if decay:
+                # Removes users with one remaining offence and decrements everyone else
+                removed = (
+                    db_session.query(YellingBans)
+                    .filter(YellingBans.value <= 1)
+                    .delete(synchronize_session=False)
+                )
+                decremented = db_session.query(YellingBans).update(
+                    {YellingBans.value: YellingBans.value - 1},
+                    synchronize_session=False,
+                )
+            db_session.commit()
+        finally:
+            db_session.close()
+        logging.info(
+            f"Wrote {len(pending)} yelling offence count(s)"
+            + (
+                f" and decayed bans ({removed} removed, {decremented} decremented)"
+                if decay
+                else ""
+            )
+            + f" in {time.perf_counter() - start_time:.3f}s"
+        )
+
+    async def flush(self):
+        """Writes all changed counts to the database, off the event loop"""
+        async with self._write_lock:
+            if not (pending := self._take_dirty()):
+                return
+            try:
+                await asyncio.to_thread(self._write, pending)
+            except Exception:
+                # try again with the next flush, unless they have changed since
+                self._dirty.update(pending)
+                raise
+
+    async def decay(self):
+        """
+        Decays every user's offence count by one. This is applied in memory straight
+        away, and to the database (after any changed counts are written) off the event loop.
+        """
+        async with self._write_lock:
+            pending = self._take_dirty()
+            self._counts = {
+                user_id: value - 1
+                for user_id, value in self._counts.items()
+                if value > 1
+            }
+            try:
+                await asyncio.to_thread(self._write, pending, True)
+            except Exception:
+                # try writing the changed counts again with the next flush
+                self._dirty.update(pending)
+                raise
+
+
 class Yelling(commands.Cog):
     CHANNEL_NAME = "yelling"
+    # Seconds between writing changed offence counts to the database
+    OFFENCE_FLUSH_INTERVAL = 60
 
     def __init__(self, bot: UQCSBot):
         self.bot = bot
+        # The database isn't set up until after the cog is created
+        self.offences = YellingOffences(lambda: bot.create_db_session())
         self.bot.schedule_task(
             self.clear_bans, trigger="cron", hour=17, timezone="Australia/Brisbane"
         )
+        self.bot.schedule_task(
+            self.flush_offences,
+            trigger="interval",
+            seconds=self.OFFENCE_FLUSH_INTERVAL,
+        )
+
+    async def cog_load(self):
+        await asyncio.to_thread(self.offences.load)
+
+    async def cog_unload(self):
+        await self.offences.flush()
+
+    def _find_yelling_targets(self):
+        """Finds the #yelling channel and disapproval emoji for yelling_exemptor"""
+        channel = discord.utils.get(
+            self.bot.uqcs_server.text_channels, name=self.CHANNEL_NAME
+        )
+        _yelling_targets.channel_id = channel.id if channel else 0
+        _yelling_targets.disapproval_emoji = discord.utils.get(
+            self.bot.emojis, name="disapproval"
+        )
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # As channels aren't ready when __init__() is called
+        self._find_yelling_targets()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self._find_yelling_targets()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self._find_yelling_targets()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        if before.name != after.name:
+            self._find_yelling_targets()
+
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(
+        self,
+        guild: discord.Guild,
+        before: Sequence[discord.Emoji],
+        after: Sequence[discord.Emoji],
+    ):
+        self._find_yelling_targets()
 
     @commands.Cog.listener()
     async def on_message_edit(self, old: discord.Message, new: discord.Message):
@@ -85,6 +311,9 @@ class Yelling(commands.Cog):
         ):
             return
 
+        # cleaning only removes lowercase characters, so most messages can skip it
+        if not self.contains_lowercase(new.content):
+            return
         text = self.clean_text(new.content)
 
         if self.contains_lowercase(text):
@@ -103,6 +332,9 @@ class Yelling(commands.Cog):
         ):
             return
 
+        # cleaning only removes lowercase characters, so most messages can skip it
+        if not self.contains_lowercase(msg.content):
+            return
         text = self.clean_text(msg.content)
 
         # check if minuscule in message, and if so, post response
@@ -113,74 +345,35 @@ class Yelling(commands.Cog):
 
     @staticmethod
     async def external_handle_bans(bot: UQCSBot, author: discord.Member):
-        db_session = bot.create_db_session()
-        yellingbans_query = (
-            db_session.query(YellingBans)
-            .filter(YellingBans.user_id == author.id)
-            .one_or_none()
-        )
-        if yellingbans_query is None:
-            value = 0
-            db_session.add(YellingBans(user_id=author.id, value=1))
-        else:
-            value = yellingbans_query.value
-            yellingbans_query.value += 1
-        db_session.commit()
-        db_session.close()
-
-        await author.timeout(timedelta(seconds=(15 * 2**value)), reason="#yelling")
+        """Handles a yelling offence from outside of this cog (e.g. yelling_exemptor)"""
+        if isinstance(cog := bot.get_cog(Yelling.__cog_name__), Yelling):
+            await cog.handle_bans(author)
 
     async def handle_bans(self, author: discord.Member):
-        db_session = self.bot.create_db_session()
-        yellingbans_query = (
-            db_session.query(YellingBans)
-            .filter(YellingBans.user_id == author.id)
-            .one_or_none()
+        previous_offences = self.offences.record_offence(author.id)
+        await author.timeout(
+            timedelta(seconds=(15 * 2**previous_offences)), reason="#yelling"
         )
-        if yellingbans_query is None:
-            value = 0
-            db_session.add(YellingBans(user_id=author.id, value=1))
-        else:
-            value = yellingbans_query.value
-            yellingbans_query.value += 1
-        db_session.commit()
-        db_session.close()
 
-        await author.timeout(timedelta(seconds=(15 * 2**value)), reason="#yelling")
+    async def flush_offences(self):
+        """Writes any changed offence counts to the database"""
+        await self.offences.flush()
 
     async def clear_bans(self):
-        db_session = self.bot.create_db_session()
-        yellingbans_query = db_session.query(YellingBans)
-        for i in yellingbans_query:
-            if i.value <= 1:
-                db_session.delete(i)
-            else:
-                i.value -= 1
-        db_session.commit()
-        db_session.close()
+        """Decays every user's yelling offence count by one, once a day"""
+        await self.offences.decay()
 
-    def clean_text(self, message: str) -> str:
+    @staticmethod
+    def clean_text(message: str) -> str:
         """Cleans text of links, emoji, and any character escaping."""
-
-        # ignore emoji and links
-        text = re.sub(
-            r"<(?P<animated>a?):(?P<name>\w{2,32}):(?P<id>\d{18,22})>",
-            lambda m: m.group(0).upper(),
-            message,
-            flags=re.UNICODE,
-        )
-
-        # slightly more permissive version of discord's url regex, matches absolutely anything between http(s):// and whitespace
-        for url in re.findall(r"https?:\/\/[^\s]+", text, flags=re.UNICODE):
-            text = text.replace(url, url.upper())
-
-        text = text.replace("&gt;", ">").replace("&lt;", "<").replace("&amp;", "&")
-
-        return text
+        return _CLEAN_PATTERN.sub(_clean_match, message)
 
     @staticmethod
     def contains_lowercase(message: str) -> bool:
         """Checks if message contains any lowercase characters"""
+        if message.isascii():
+            # only a-z change when upper-cased, so this avoids checking each character in Python
+            return message.upper() != message
         return any(char.islower() for char in message)
 
     def generate_response(self, text: str) -> str: